@@ -22,6 +22,9 @@ Miljövariabler som hanteras:
 - STOP_LOSS_PERCENTAGE (valfritt, float, default: 3.0)
 - QUOTE_ASSETS (valfritt, endast "USDC" stöds)
 - TA2_USE_EMA50_FILTER (valfritt, true/false, default: false)
+- COMPRESS_VISUALIZE (valfritt, true/false, default: false)
+- VISUALIZE_PLOTLY_CDN (valfritt, true/false, default: false)
+- VISUALIZE_FORCE_REGEN (valfritt, true/false, default: false)
 """
 import os
 from typing import List
@@ -132,6 +135,9 @@ def load_config_from_env() -> Config:
 
     dry_run = _parse_bool(env.get("DRY_RUN", "false"))
     ta2_use_ema50_filter = _parse_bool(env.get("TA2_USE_EMA50_FILTER", "false"))
+    compress_visualize = _parse_bool(env.get("COMPRESS_VISUALIZE", "false"))
+    visualize_plotly_cdn = _parse_bool(env.get("VISUALIZE_PLOTLY_CDN", "false"))
+    visualize_force_regen = _parse_bool(env.get("VISUALIZE_FORCE_REGEN", "false"))
 
     binance_currency_history_endpoint = env.get(
         "BINANCE_CURRENCY_HISTORY_ENDPOINT", defaults["BINANCE_CURRENCY_HISTORY_ENDPOINT"]
@@ -177,6 +183,9 @@ def load_config_from_env() -> Config:
         ftp_html_regexp=ftp_html_regexp,
         binance_api_env=binance_api_env,
         ta2_use_ema50_filter=ta2_use_ema50_filter,
+        compress_visualize=compress_visualize,
+        visualize_plotly_cdn=visualize_plotly_cdn,
+        visualize_force_regen=visualize_force_regen,
         raw_env={k: env.get(k) for k in list(env.keys())},
     )
 
@@ -28,3 +28,6 @@ class Config:
     raw_env: dict
     binance_api_env: str = "live"
     ta2_use_ema50_filter: bool = False
+    compress_visualize: bool = False
+    visualize_plotly_cdn: bool = False
+    visualize_force_regen: bool = False
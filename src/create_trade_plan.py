@@ -16,7 +16,6 @@ import logging
 import csv
 from pathlib import Path
 from typing import List, Dict, Optional
-import pandas as pd
 
 from .config import Config
 
@@ -37,12 +36,28 @@ class CreateTradePlan:
         """Create directory if it doesn't exist."""
         path.mkdir(parents=True, exist_ok=True)
 
-    def _read_portfolio_summary(self) -> Optional[pd.DataFrame]:
+    def _read_csv_rows(self, path: Path) -> List[Dict[str, str]]:
+        """
+        Read a small CSV file into a list of row dictionaries.
+        
+        The input files hold one row per currency, so the stdlib csv reader is
+        used instead of pandas to avoid DataFrame construction and type inference.
+        
+        Args:
+            path: CSV file to read
+        
+        Returns:
+            List of row dictionaries (values as strings)
+        """
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            return list(csv.DictReader(f))
+
+    def _read_portfolio_summary(self) -> Optional[List[Dict[str, str]]]:
         """
         Read portfolio summary.
         
         Returns:
-            DataFrame with portfolio summary or None if not found
+            List of portfolio rows or None if not found
         """
         portfolio_file = self.summarised_root / "portfolio.csv"
         
@@ -51,21 +66,21 @@ class CreateTradePlan:
             return None
         
         try:
-            df = pd.read_csv(portfolio_file)
-            if df.empty:
+            rows = self._read_csv_rows(portfolio_file)
+            if not rows:
                 log.warning("Portfolio summary file is empty")
                 return None
-            return df
+            return rows
         except Exception as e:
             log.error(f"Failed to read portfolio summary: {e}")
             return None
 
-    def _read_recommendations(self) -> Optional[pd.DataFrame]:
+    def _read_recommendations(self) -> Optional[List[Dict[str, str]]]:
         """
         Read rebalance recommendations.
         
         Returns:
-            DataFrame with recommendations or None if not found
+            List of recommendation rows or None if not found
         """
         recommendations_file = self.output_root / "recommendations.csv"
         
@@ -74,36 +89,35 @@ class CreateTradePlan:
             return None
         
         try:
-            df = pd.read_csv(recommendations_file)
-            if df.empty:
+            rows = self._read_csv_rows(recommendations_file)
+            if not rows:
                 log.info("Recommendations file is empty")
-                return pd.DataFrame(columns=['currency', 'decision_step'])
-            return df
+            return rows
         except Exception as e:
             log.error(f"Failed to read recommendations: {e}")
             return None
 
-    def _get_liquid_funds(self, portfolio_df: pd.DataFrame) -> float:
+    def _get_liquid_funds(self, portfolio: Dict[str, Dict[str, str]]) -> float:
         """
         Get current liquid funds (USDC balance) from portfolio.
         
         Args:
-            portfolio_df: Portfolio DataFrame
+            portfolio: Portfolio rows keyed by currency
         
         Returns:
             Liquid funds in USDC
         """
         # USDC row should have currency='USDC' and current_value_usdc represents the balance
-        usdc_row = portfolio_df[portfolio_df['currency'] == 'USDC']
-        if usdc_row.empty:
+        usdc_row = portfolio.get('USDC')
+        if usdc_row is None:
             log.warning("USDC not found in portfolio, assuming 0 liquid funds")
             return 0.0
         
         try:
-            liquid_funds = float(usdc_row.iloc[0]['current_value_usdc'])
+            liquid_funds = float(usdc_row['current_value_usdc'])
             log.info(f"Current liquid funds: {liquid_funds:.2f} USDC")
             return liquid_funds
-        except (ValueError, KeyError) as e:
+        except (ValueError, KeyError, TypeError) as e:
             log.error(f"Error parsing USDC balance: {e}")
             return 0.0
 
@@ -117,40 +131,46 @@ class CreateTradePlan:
         log.info("=== Generating trade plan ===")
         
         # Read inputs
-        portfolio_df = self._read_portfolio_summary()
-        if portfolio_df is None:
+        portfolio_rows = self._read_portfolio_summary()
+        if portfolio_rows is None:
             log.error("Cannot proceed without portfolio summary")
             return []
         
-        recommendations_df = self._read_recommendations()
-        if recommendations_df is None:
+        recommendations = self._read_recommendations()
+        if recommendations is None:
             log.error("Cannot proceed without recommendations")
             return []
         
+        # Index portfolio by currency (first row wins, as before)
+        portfolio: Dict[str, Dict[str, str]] = {}
+        for row in portfolio_rows:
+            portfolio.setdefault(row['currency'], row)
+        
         trade_plan = []
-        liquid_funds = self._get_liquid_funds(portfolio_df)
-        action_column = 'decision_step' if 'decision_step' in recommendations_df.columns else 'signal'
+        liquid_funds = self._get_liquid_funds(portfolio)
+        columns = recommendations[0].keys() if recommendations else {'currency', 'decision_step'}
+        action_column = 'decision_step' if 'decision_step' in columns else 'signal'
 
-        if action_column not in recommendations_df.columns:
+        if action_column not in columns:
             log.error("Recommendations file must contain decision_step or signal column")
             return []
         
         # Process SELL recommendations first
-        sell_recommendations = recommendations_df[recommendations_df[action_column] == 'SELL']
+        sell_recommendations = [rec for rec in recommendations if rec[action_column] == 'SELL']
         
-        for _, rec in sell_recommendations.iterrows():
+        for rec in sell_recommendations:
             currency = rec['currency']
             
             # Get current value from portfolio
-            portfolio_row = portfolio_df[portfolio_df['currency'] == currency]
-            if portfolio_row.empty:
+            portfolio_row = portfolio.get(currency)
+            if portfolio_row is None:
                 log.warning(f"Currency {currency} not found in portfolio, skipping SELL")
                 continue
             
             try:
-                current_value_usdc = float(portfolio_row.iloc[0]['current_value_usdc'])
-                balance = float(portfolio_row.iloc[0]['balance'])
-            except (ValueError, KeyError) as e:
+                current_value_usdc = float(portfolio_row['current_value_usdc'])
+                balance = float(portfolio_row['balance'])
+            except (ValueError, KeyError, TypeError) as e:
                 log.error(f"Error parsing portfolio data for {currency}: {e}")
                 continue
             
@@ -173,15 +193,15 @@ class CreateTradePlan:
         
         # Process BUY recommendations - only if liquid funds > threshold
         if liquid_funds > self.cfg.trade_threshold:
-            buy_recommendations = recommendations_df[recommendations_df[action_column] == 'BUY']
+            buy_recommendations = [rec for rec in recommendations if rec[action_column] == 'BUY']
             
-            if not buy_recommendations.empty:
+            if buy_recommendations:
                 # Take up to 2 BUY candidates (already sorted by priority in recommendations.csv)
-                buy_candidates = buy_recommendations.head(2)
+                buy_candidates = buy_recommendations[:2]
                 
                 if len(buy_candidates) == 1:
                     # Single BUY candidate: use all liquid funds
-                    currency = buy_candidates.iloc[0]['currency']
+                    currency = buy_candidates[0]['currency']
                     trade = {
                         'action': 'BUY',
                         'currency': currency,
@@ -197,7 +217,7 @@ class CreateTradePlan:
                     if allocation > self.cfg.trade_threshold:
                         # Both allocations exceed threshold, create 2 BUYs
                         for i in range(2):
-                            currency = buy_candidates.iloc[i]['currency']
+                            currency = buy_candidates[i]['currency']
                             trade = {
                                 'action': 'BUY',
                                 'currency': currency,
@@ -208,7 +228,7 @@ class CreateTradePlan:
                             log.info(f"BUY: {currency} with {allocation:.2f} USDC (split 1/2)")
                     else:
                         # Split too small, fallback to single BUY with all liquid funds
-                        currency = buy_candidates.iloc[0]['currency']
+                        currency = buy_candidates[0]['currency']
                         trade = {
                             'action': 'BUY',
                             'currency': currency,
@@ -148,6 +148,7 @@ class ExecuteTradePlan:
         self.data_root = Path(cfg.data_area_root_dir)
         self.output_root = self.data_root / "output" / "rebalance"
         self.broker = None
+        self._exchange_info = None
     
     def _init_broker(self) -> None:
         """Initialize CCXT broker if not in dry run mode."""
@@ -160,6 +161,18 @@ class ExecuteTradePlan:
                 api_env=self.cfg.binance_api_env,
             )
     
+    def _get_exchange_info(self) -> list:
+        """
+        Fetch exchange info from the broker once and reuse it for the rest of the run.
+        
+        Returns:
+            List of market dictionaries
+        """
+        if self._exchange_info is None:
+            self._init_broker()
+            self._exchange_info = self.broker.fetch_exchange_info()
+        return self._exchange_info
+    
     def _validate_exchange_info(self) -> bool:
         """
         Validate exchange info from Binance.
@@ -174,8 +187,7 @@ class ExecuteTradePlan:
                 log.info("DRY_RUN mode: skipping exchange info validation")
                 return True
             
-            self._init_broker()
-            exchange_info = self.broker.fetch_exchange_info()
+            exchange_info = self._get_exchange_info()
             
             if not exchange_info:
                 log.error("Exchange info is empty")
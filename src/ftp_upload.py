@@ -9,6 +9,7 @@ from __future__ import annotations
 
 import argparse
 import ftplib
+import functools
 import logging
 import os
 import re
@@ -20,10 +21,27 @@ from .config import Config
 log = logging.getLogger(__name__)
 
 
-def _upload_files(files: List[Path], host: str, directory: str,
-                  username: str, password: str) -> int:
-    """Ladda upp filer via FTP. Returnerar antal uppladdade filer."""
-    uploaded = 0
+@functools.lru_cache(maxsize=64)
+def _compile_pattern(pattern: str) -> re.Pattern:
+    """Kompilera FTP_HTML_REGEXP en gång och återanvänd mellan körningar."""
+    return re.compile(pattern)
+
+
+def _store_file(ftp: ftplib.FTP, remote_name: str, f) -> str:
+    """
+    Ladda upp en öppen fil med STOR via socket.sendfile.
+
+    Motsvarar ftp.storbinary men kopierar fil -> datasocket i kärnan
+    (sendfile(2)) i stället för read/send-loopar i Python. Anroparen
+    ansvarar för att binärläge (TYPE I) redan är satt.
+    """
+    with ftp.transfercmd(f"STOR {remote_name}") as conn:
+        conn.sendfile(f)
+    return ftp.voidresp()
+
+
+def _connect(host: str, directory: str, username: str, password: str) -> ftplib.FTP:
+    """Öppna en inloggad FTP-anslutning, ställd i angiven katalog."""
     log.info("Connecting to FTP %s as %s ...", host, username)
     ftp = ftplib.FTP(host)
     try:
@@ -31,21 +49,45 @@ def _upload_files(files: List[Path], host: str, directory: str,
         if directory:
             ftp.cwd(directory)
             log.info("Changed FTP directory to %s", directory)
-        for filepath in files:
-            remote_name = filepath.name
-            log.info("Uploading %s -> %s", filepath, remote_name)
-            with open(filepath, "rb") as f:
-                ftp.storbinary(f"STOR {remote_name}", f)
-            uploaded += 1
-            log.info("Upload completed: %s", remote_name)
-    finally:
-        try:
-            ftp.quit()
-        except Exception:
-            ftp.close()
+    except Exception:
+        _disconnect(ftp)
+        raise
+    return ftp
+
+
+def _disconnect(ftp: ftplib.FTP) -> None:
+    """Avsluta FTP-sessionen, stäng socketen direkt om QUIT misslyckas."""
+    try:
+        ftp.quit()
+    except Exception:
+        ftp.close()
+
+
+def _store_files(ftp: ftplib.FTP, files: List[Path]) -> int:
+    """Ladda upp filer över en öppen anslutning. Returnerar antal uppladdade filer."""
+    uploaded = 0
+    # Binärläget gäller hela sessionen, så TYPE I skickas en gång per batch
+    ftp.voidcmd("TYPE I")
+    for filepath in files:
+        remote_name = filepath.name
+        log.info("Uploading %s -> %s", filepath, remote_name)
+        with open(filepath, "rb") as f:
+            _store_file(ftp, remote_name, f)
+        uploaded += 1
+        log.info("Upload completed: %s", remote_name)
     return uploaded
 
 
+def _upload_files(files: List[Path], host: str, directory: str,
+                  username: str, password: str) -> int:
+    """Ladda upp filer via FTP. Returnerar antal uppladdade filer."""
+    ftp = _connect(host, directory, username, password)
+    try:
+        return _store_files(ftp, files)
+    finally:
+        _disconnect(ftp)
+
+
 def upload_file_to_ftp(filepath: Path, host: Optional[str], directory: Optional[str],
                        username: Optional[str], password: Optional[str]) -> bool:
     """Ladda upp en enskild fil via FTP med samma målmapp som övriga uppladdningar."""
@@ -76,13 +118,27 @@ class FtpUpload:
         self.data_root = Path(cfg.data_area_root_dir)
 
     def _find_html_files(self, pattern: str) -> List[Path]:
-        """Hitta alla .html-filer under data_root som matchar regexp-mönstret."""
-        regex = re.compile(pattern)
+        """
+        Hitta alla .html-filer under data_root som matchar regexp-mönstret.
+
+        Går igenom katalogträdet med os.scandir och jämför strängar; Path-objekt
+        skapas bara för de filer som matchar. Symlänkade kataloger följs inte.
+        """
+        regex = _compile_pattern(pattern)
         matched: List[Path] = []
-        for html_file in sorted(self.data_root.rglob("*.html")):
-            if regex.search(str(html_file)):
-                matched.append(html_file)
-        return matched
+        stack = [str(self.data_root)]
+        while stack:
+            try:
+                entries = os.scandir(stack.pop())
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith(".html") and regex.search(entry.path):
+                        matched.append(Path(entry.path))
+        return sorted(matched)
 
     def _upload_files(self, files: List[Path], host: str, directory: str,
                       username: str, password: str) -> int:
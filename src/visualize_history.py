@@ -13,25 +13,189 @@ att välja vilken valuta som visas. Varje valutadiagram innehåller:
 - Klick på köp/sälj-symbol visar detaljerad handelsinformation
 
 Sparar resultaten i DATA_AREA_ROOT_DIR/visualize/history_chart.html
+(samt history_chart.html.gz om COMPRESS_VISUALIZE är satt). plotly.js bäddas
+in i dokumentet, eller hämtas från cdn.plot.ly om VISUALIZE_PLOTLY_CDN är satt.
+Bredvid skrivs history_chart.manifest.json med storlek/mtime för alla
+indatafiler, men bara om alla delar av sidan byggdes utan fel. Om inget ändrats sedan förra bygget
+hoppas diagramgenereringen över (om inte VISUALIZE_FORCE_REGEN är satt);
+debug.csv skrivs dock om varje körning.
 """
 from __future__ import annotations
 
+import base64
+import functools
+import gzip
+import hashlib
 import json
 import logging
+from contextlib import ExitStack
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from string import Template
+from typing import Any, Dict, Iterator, List, Optional
 
 import pandas as pd
+import plotly
 import plotly.graph_objects as go
-from plotly.offline import get_plotlyjs
+from plotly.offline import get_plotlyjs, get_plotlyjs_version
 from plotly.subplots import make_subplots
 
 from .config import Config
 
 log = logging.getLogger(__name__)
 
+# Tradefält som visas som text i köp/säljmarkeringarnas tooltip
+_TRADE_TEXT_FIELDS = ["symbol", "price", "qty", "quoteQty", "commission", "commissionAsset"]
+
+# Kolumner i _trade_markers som skickas som customdata, i hovertemplate-ordning
+TRADE_CUSTOMDATA_COLUMNS = [
+    "action", "symbol", "price", "qty", "quoteQty",
+    "commission", "commissionAsset", "time_str", "change_str",
+]
+
+# Tooltip för köp/säljmarkeringar, fälten kommer från TRADE_CUSTOMDATA_COLUMNS
+TRADE_HOVERTEMPLATE = (
+    "<b>%{customdata[0]}</b><br>"
+    "Symbol: %{customdata[1]}<br>"
+    "Pris: %{customdata[2]}<br>"
+    "Mängd: %{customdata[3]}<br>"
+    "Totalt (quote): %{customdata[4]}<br>"
+    "Avgift: %{customdata[5]} %{customdata[6]}<br>"
+    "Tid: %{customdata[7]}%{customdata[8]}"
+    "<extra></extra>"
+)
+
+# Tidsformat för x-axlar; samma naiva UTC-form som Plotly själv serialiserar till
+X_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+# Höjs när genereringen ändras så att diagram från äldre kod byggs om
+_MANIFEST_VERSION = 1
+
+# Skrivbuffert för history_chart.html; plotly.js-fragmentet ensamt är ~3 MB
+HTML_WRITE_BUFFER = 1 << 20
+
+_HTML_HEAD = (
+    "<!DOCTYPE html>\n"
+    '<html lang="sv">\n'
+    "<head>\n"
+    '<meta charset="utf-8">\n'
+    '<meta name="viewport" content="width=device-width, initial-scale=1">\n'
+    "<title>Kurshistorik</title>\n"
+)
+
+_HTML_STYLE = (
+    "<style>\n"
+    "body{background:#1a1a2e;color:#cdd6f4;font-family:sans-serif;margin:0;padding:0}\n"
+    ".vh-tabs{padding:0 20px;background:#16213e;border-bottom:1px solid #45475a;"
+    "display:flex;align-items:flex-end;gap:4px;overflow-x:auto;flex-wrap:nowrap;"
+    "-webkit-overflow-scrolling:touch}\n"
+    ".vh-tab{background:#2a2a3e;color:#cdd6f4;border:1px solid #45475a;"
+    "border-bottom:none;border-radius:6px 6px 0 0;padding:10px 20px;"
+    "font-size:15px;cursor:pointer;margin-bottom:-1px;transition:background 0.15s;"
+    "flex-shrink:0}\n"
+    ".vh-tab:hover{background:#3a3a5e}\n"
+    ".vh-tab-active{background:#1a1a2e;color:#89dceb;border-bottom:1px solid #1a1a2e}\n"
+    ".vh-tab-portfolio{color:#a6e3a1;border-color:#a6e3a1}\n"
+    ".vh-tab-portfolio.vh-tab-active{color:#a6e3a1}\n"
+    ".vh-tab-summary{color:#cba6f7;border-color:#cba6f7}\n"
+    ".vh-tab-summary.vh-tab-active{color:#cba6f7}\n"
+    ".vh-tab-sep{width:1px;background:#45475a;margin:6px 4px;align-self:stretch}\n"
+    ".vh-created-at{margin-left:auto;color:#4a5a80;font-size:11px;padding-bottom:10px;align-self:flex-end;white-space:nowrap}\n"
+    ".vh-sum-h2{color:#cdd6f4;margin-top:16px;font-size:18px}\n"
+    ".vh-sum-table{border-collapse:collapse;min-width:480px;font-size:14px}\n"
+    ".vh-sum-table th{background:#16213e;color:#89b4fa;padding:8px 16px;"
+    "text-align:left;border-bottom:2px solid #45475a;white-space:nowrap}\n"
+    ".vh-sum-table td{padding:7px 16px;border-bottom:1px solid #313244;color:#cdd6f4}\n"
+    ".vh-sum-table tr:hover td{background:#1e1e2e}\n"
+    ".vh-sum-buy{color:#a6e3a1;font-weight:bold}\n"
+    ".vh-sum-sell{color:#f38ba8;font-weight:bold}\n"
+    ".vh-sum-pos{color:#a6e3a1}\n"
+    ".vh-sum-neg{color:#f38ba8}\n"
+    "</style>\n"
+)
+
+# Flikväxling och månadszoom; $currencies ersätts med flikarnas nycklar
+_COMBINED_JS = Template(
+    "var _currencies = [$currencies];\n"
+    "function _tabClass(x, active) {\n"
+    "  var cls = 'vh-tab';\n"
+    "  if (x === 'Performance') cls += ' vh-tab-portfolio';\n"
+    "  if (x === 'Overview') cls += ' vh-tab-summary';\n"
+    "  if (active) cls += ' vh-tab-active';\n"
+    "  return cls;\n"
+    "}\n"
+    "function applyLastMonth(chartId) {\n"
+    "  var el = document.getElementById(chartId);\n"
+    "  if (!el || !el.data || !el.data[0]) return;\n"
+    "  var xs = el.data[0].x;\n"
+    "  if (!xs || !xs.length) return;\n"
+    "  var lastDate = new Date(xs[xs.length - 1]);\n"
+    "  var startDate = new Date(lastDate);\n"
+    "  startDate.setMonth(startDate.getMonth() - 1);\n"
+    "  Plotly.relayout(el, {\n"
+    "    'xaxis.range[0]': startDate.toISOString(),\n"
+    "    'xaxis.range[1]': lastDate.toISOString(),\n"
+    "    'xaxis.rangeselector.active': 1\n"
+    "  });\n"
+    "}\n"
+    "function showChart(c) {\n"
+    "  _currencies.forEach(function(x) {\n"
+    "    var w = document.getElementById('wrapper-' + x);\n"
+    "    if (w) w.style.display = x === c ? '' : 'none';\n"
+    "    var t = document.getElementById('tab-' + x);\n"
+    "    if (t) t.className = _tabClass(x, x === c);\n"
+    "  });\n"
+    "  var el = document.getElementById('chart-' + c);\n"
+    "  if (el) {\n"
+    "    Plotly.Plots.resize(el);\n"
+    "    applyLastMonth('chart-' + c);\n"
+    "  }\n"
+    "}\n"
+    "window.addEventListener('load', function() {\n"
+    "  if (_currencies.length > 0) applyLastMonth('chart-' + _currencies[0]);\n"
+    "});\n"
+)
+
+
+@functools.cache
+def _plotly_js() -> str:
+    """plotly.js (~3 MB) läses från disk en gång per process."""
+    return get_plotlyjs()
+
+
+@functools.cache
+def _plotly_cdn_script() -> str:
+    """
+    <script>-tagg som hämtar samma plotly.js-version från cdn.plot.ly.
+
+    Integritetshashen beräknas på det lokala paketets plotly.js, precis som
+    Plotlys egen include_plotlyjs="cdn".
+    """
+    digest = hashlib.sha256(_plotly_js().encode("utf-8")).digest()
+    return (
+        f'<script charset="utf-8" src="https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js" '
+        f'integrity="sha256-{base64.b64encode(digest).decode("ascii")}" crossorigin="anonymous"></script>\n'
+    )
+
+
+def _figure_div(fig: go.Figure, div_id: str) -> str:
+    """
+    Bygg en diagram-div med ett Plotly.newPlot-anrop för figuren.
+
+    Ersätter fig.to_html(full_html=False): figuren serialiseras en gång med
+    to_json (som escapar '<' och '/' och därför kan bäddas in i <script>)
+    utan att gå via Plotlys HTML-mall.
+    """
+    height = f"{fig.layout.height}px" if fig.layout.height else "100%"
+    return (
+        f'<div style="height:{height}; width:100%;">'
+        f'<div id="{div_id}" class="plotly-graph-div" style="height:100%; width:100%;"></div>'
+        f"<script>(function() {{ var fig = {fig.to_json()}; "
+        f'Plotly.newPlot("{div_id}", fig.data, fig.layout, {{"responsive": true}}); }})();</script>'
+        "</div>"
+    )
+
 
 class VisualizeHistory:
     """Generera interaktiva kurshistorikdiagram med köp/säljmarkeringar."""
@@ -42,10 +206,58 @@ class VisualizeHistory:
         self.history_root = self.data_root / "history"
         self.trades_file = self.data_root / "trades" / "trades.json"
         self.output_dir = self.data_root / "visualize"
+        self.html_file = self.output_dir / "history_chart.html"
+        self.manifest_file = self.output_dir / "history_chart.manifest.json"
 
     def _ensure_dir(self, path: Path) -> None:
         path.mkdir(parents=True, exist_ok=True)
 
+    def _input_manifest(self) -> Dict[str, Any]:
+        """
+        Sammanställ (mtime, storlek) för alla filer som diagrammet byggs från.
+
+        Saknade filer registreras som None. Valutalistan, komprimeringsflaggan och
+        CDN-flaggan ingår eftersom de också påverkar det genererade dokumentet,
+        liksom manifest- och plotly-version så att kod- och biblioteksbyten
+        tvingar fram ett nytt bygge.
+        """
+        files = [
+            self.trades_file,
+            self.data_root / "portfolio" / "portfolio.json",
+            self.data_root / "output" / "rebalance" / "recommendations.csv",
+        ]
+        for currency in self.cfg.currencies:
+            files.append(self.history_root / f"{currency}_history.csv")
+            files.append(
+                self.data_root / "output" / "backtesting" / f"{currency}_backtesting.csv"
+            )
+
+        stats: Dict[str, Optional[List[int]]] = {}
+        for path in files:
+            key = str(path.relative_to(self.data_root))
+            try:
+                st = path.stat()
+                stats[key] = [st.st_mtime_ns, st.st_size]
+            except FileNotFoundError:
+                stats[key] = None
+
+        return {
+            "manifest_version": _MANIFEST_VERSION,
+            "plotly_version": plotly.__version__,
+            "currencies": list(self.cfg.currencies),
+            "compress_visualize": self.cfg.compress_visualize,
+            "visualize_plotly_cdn": self.cfg.visualize_plotly_cdn,
+            "files": stats,
+        }
+
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        """Läs manifestet från förra bygget, None om det saknas eller är trasigt."""
+        try:
+            with open(self.manifest_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
     def _read_backtest(self, currency: str) -> Optional[pd.DataFrame]:
         """Läs backtestresultat för angiven valuta.
 
@@ -88,6 +300,15 @@ class VisualizeHistory:
             log.error("Error reading price history for %s: %s", currency, e)
             return None
 
+    def _read_history_frames(self) -> Dict[str, pd.DataFrame]:
+        """Läs kurshistorik för alla konfigurerade valutor; saknade/tomma utelämnas."""
+        dfs: Dict[str, pd.DataFrame] = {}
+        for currency in self.cfg.currencies:
+            df = self._read_history(currency)
+            if df is not None and not df.empty:
+                dfs[currency] = df
+        return dfs
+
     def _read_trades(self) -> List[Dict[str, Any]]:
         """Läs tradehistorik från JSON-fil."""
         if not self.trades_file.exists():
@@ -105,55 +326,91 @@ class VisualizeHistory:
             log.error("Error reading trade history: %s", e)
             return []
 
-    def _filter_trades_for_currency(
-        self, trades: List[Dict[str, Any]], currency: str
-    ) -> List[Dict[str, Any]]:
-        """Filtrera trades för angiven valuta (base asset)."""
-        currency_upper = currency.upper()
-        return [
-            t for t in trades
-            if str(t.get("symbol", "")).upper().startswith(currency_upper)
-        ]
+    @staticmethod
+    def _group_trades_by_currency(
+        trades: List[Dict[str, Any]], currencies: List[str]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Dela upp trades per valuta (base asset) i ett enda pass.
 
-    def _format_trade_label(
-        self, trade: Dict[str, Any], buy_price: Optional[float] = None
-    ) -> str:
-        """Skapa en detaljerad textetikett för ett trade."""
-        is_buyer = trade.get("isBuyer", False)
-        action = "KÖP" if is_buyer else "SÄLJ"
-        symbol = trade.get("symbol", "?")
-        price = trade.get("price", "?")
-        qty = trade.get("qty", "?")
-        quote_qty = trade.get("quoteQty", "?")
-        commission = trade.get("commission", "?")
-        commission_asset = trade.get("commissionAsset", "?")
-        trade_time_ms = trade.get("time")
-        if trade_time_ms:
-            dt = datetime.fromtimestamp(trade_time_ms / 1000, tz=timezone.utc)
-            time_str = dt.strftime("%Y-%m-%d %H:%M:%S UTC")
-        else:
-            time_str = "?"
-
-        label = (
-            f"<b>{action}</b><br>"
-            f"Symbol: {symbol}<br>"
-            f"Pris: {price}<br>"
-            f"Mängd: {qty}<br>"
-            f"Totalt (quote): {quote_qty}<br>"
-            f"Avgift: {commission} {commission_asset}<br>"
-            f"Tid: {time_str}"
+        Symbolen matchas mot valutorna i fallande längdordning så att t.ex.
+        ETHFIUSDC hamnar under ETHFI och inte under ETH. Trades som inte
+        matchar någon valuta utelämnas.
+        """
+        by_currency: Dict[str, List[Dict[str, Any]]] = {c: [] for c in currencies}
+        prefixes = sorted(
+            ((c.upper(), c) for c in currencies), key=lambda p: len(p[0]), reverse=True
         )
+        for t in trades:
+            symbol = str(t.get("symbol", "")).upper()
+            for prefix, currency in prefixes:
+                if symbol.startswith(prefix):
+                    by_currency[currency].append(t)
+                    break
+        return by_currency
 
-        if not is_buyer and buy_price is not None and buy_price > 0:
+    def _trade_markers(
+        self,
+        currency_trades: List[Dict[str, Any]],
+        start_ms: int,
+        end_ms: int,
+    ) -> pd.DataFrame:
+        """
+        Bygg markördata för köp/sälj inom kurshistorikens tidsintervall.
+
+        Intervallet [start_ms, end_ms] anges i epoch-millisekunder och jämförs
+        direkt mot tradens "time", så millisekundprecisionen behålls. Reglerna är
+        desamma som i den tidigare per-trade-loopen: trades utan tid, eller vars
+        pris finns men inte kan tolkas som tal, utelämnas; saknas pris helt ritas
+        traden på y=0. Saknade fält visas som "?" i tooltipen medan övriga värden
+        (även None) visas med str(). Returnerar en DataFrame sorterad på tid med
+        kolumnerna x (ISO-tid), y (pris), is_buy samt customdata-fälten i
+        TRADE_CUSTOMDATA_COLUMNS. change_str innehåller förändring vs. närmast
+        föregående köp (endast SÄLJ med angivet pris, annars "").
+        """
+        rows = []
+        for trade in currency_trades:
+            trade_time_ms = trade.get("time")
+            if not trade_time_ms or not (start_ms <= trade_time_ms <= end_ms):
+                continue
             try:
-                sell_price = float(price)
-                pct_change = (sell_price - buy_price) / buy_price * 100
-                sign = "+" if pct_change >= 0 else ""
-                label += f"<br>Förändring vs. köp: {sign}{pct_change:.2f}%"
+                price = float(trade.get("price", 0))
             except (ValueError, TypeError):
-                pass
+                continue
+            rows.append(
+                (trade_time_ms, price, bool(trade.get("isBuyer", False)), "price" in trade)
+                + tuple(str(trade.get(field, "?")) for field in _TRADE_TEXT_FIELDS)
+            )
+        td = pd.DataFrame(
+            rows, columns=["time", "y", "is_buy", "has_price", *_TRADE_TEXT_FIELDS]
+        ).sort_values("time", kind="stable")
+        trade_dt = pd.to_datetime(td["time"], unit="ms", utc=True)
+
+        is_buy = td["is_buy"].astype(bool)
+        # Köp med NaN-pris ska nollställa referensen (som i loopen), men ffill
+        # hoppar över NaN - ersätt därför med -1 som ändå faller på "> 0"
+        buy_price = td["y"].fillna(-1.0).where(is_buy).ffill()
+        has_change = ~is_buy & td["has_price"].astype(bool) & (buy_price > 0)
+        pct_change = (td["y"] - buy_price) / buy_price * 100
+        sign = pd.Series("", index=td.index).where(~(pct_change >= 0), "+")
+        change_str = ("<br>Förändring vs. köp: " + sign + pct_change.map("{:.2f}%".format)).where(
+            has_change, ""
+        )
 
-        return label
+        markers = pd.DataFrame(
+            {
+                "x": trade_dt.dt.strftime(X_TIME_FORMAT),
+                "y": td["y"].astype(float),
+                "is_buy": is_buy,
+                "action": is_buy.map({True: "KÖP", False: "SÄLJ"}),
+            },
+            index=td.index,
+        )
+        for col in _TRADE_TEXT_FIELDS:
+            markers[col] = td[col]
+        markers["time_str"] = trade_dt.dt.strftime("%Y-%m-%d %H:%M:%S UTC")
+        markers["change_str"] = change_str
+        return markers.reset_index(drop=True)
 
     @staticmethod
     def _reconstruct_balance_history(
@@ -200,6 +457,17 @@ class VisualizeHistory:
 
         return pd.Series(balances, index=idx)
 
+    def _write_debug_csv_safe(
+        self,
+        trades: List[Dict[str, Any]],
+        dfs: Dict[str, pd.DataFrame],
+    ) -> None:
+        """Som _write_debug_csv men fel loggas i stället för att avbryta körningen."""
+        try:
+            self._write_debug_csv(trades, dfs)
+        except Exception as e:
+            log.error("Error writing debug CSV: %s", e)
+
     def _write_debug_csv(
         self,
         trades: List[Dict[str, Any]],
@@ -258,13 +526,11 @@ class VisualizeHistory:
             except Exception as e:
                 log.warning("Could not read portfolio balances from portfolio.json: %s", e)
 
+        trades_by_currency = self._group_trades_by_currency(trades, currencies)
         for currency in currencies:
             df = dfs[currency]
             currency_upper = currency.upper()
-            currency_trades = [
-                t for t in trades
-                if str(t.get("symbol", "")).upper().startswith(currency_upper)
-            ]
+            currency_trades = trades_by_currency[currency]
 
             current_balance = _portfolio_balances.get(currency_upper, 0.0)
 
@@ -456,12 +722,10 @@ class VisualizeHistory:
 
         portfolio_value = pd.Series(0.0, index=idx)
 
+        trades_by_currency = self._group_trades_by_currency(trades, list(dfs))
         for currency, df in dfs.items():
             currency_upper = currency.upper()
-            currency_trades = [
-                t for t in trades
-                if str(t.get("symbol", "")).upper().startswith(currency_upper)
-            ]
+            currency_trades = trades_by_currency[currency]
 
             current_balance = _portfolio_balances.get(currency_upper, 0.0)
 
@@ -571,7 +835,7 @@ class VisualizeHistory:
 
         fig.add_trace(
             go.Scatter(
-                x=perf_df["datetime"],
+                x=perf_df["datetime"].dt.strftime(X_TIME_FORMAT).to_numpy(),
                 y=perf_df["portfolio_value"],
                 name="Portföljvärde",
                 line=dict(width=2, color="#89dceb"),
@@ -613,11 +877,7 @@ class VisualizeHistory:
             fig.update_xaxes(range=[one_month_ago, last_date])
 
         log.info("Portfolio chart built")
-        return fig.to_html(
-            full_html=False,
-            include_plotlyjs=False,
-            div_id="chart-Performance",
-        )
+        return _figure_div(fig, "chart-Performance")
 
     def generate_summary_html(
         self,
@@ -888,23 +1148,28 @@ class VisualizeHistory:
             "</div>"
         )
 
-    def generate_chart(self, currency: str, trades: List[Dict[str, Any]]) -> Optional[str]:
+    def generate_chart(
+        self,
+        currency: str,
+        currency_trades: List[Dict[str, Any]],
+        history_df: Optional[pd.DataFrame] = None,
+    ) -> Optional[str]:
         """
         Generera HTML-div för angiven valuta.
 
         Args:
             currency: Valutasymbol (t.ex. "BTC")
-            trades: Lista med alla trades (filtreras internt för currency)
+            currency_trades: Trades för currency (se _group_trades_by_currency)
+            history_df: Redan inläst kurshistorik; läses från disk om None
 
         Returns:
             HTML-sträng (div) vid succé, None vid fel
         """
-        df = self._read_history(currency)
+        df = history_df if history_df is not None else self._read_history(currency)
         if df is None or df.empty:
             log.warning("No price history for %s - skipping chart", currency)
             return None
 
-        currency_trades = self._filter_trades_for_currency(trades, currency)
         backtest_df = self._read_backtest(currency)
 
         # Skapa subplot med candlestick och volym
@@ -915,10 +1180,13 @@ class VisualizeHistory:
             vertical_spacing=0.03,
         )
 
+        # Tidsaxeln formateras en gång så att Plotly slipper konvertera varje Timestamp
+        x_str = df["datetime"].dt.strftime(X_TIME_FORMAT).to_numpy()
+
         # Candlestick-diagram
         fig.add_trace(
             go.Candlestick(
-                x=df["datetime"],
+                x=x_str,
                 open=df["Open"],
                 high=df["High"],
                 low=df["Low"],
@@ -933,7 +1201,7 @@ class VisualizeHistory:
         # Volym-staplar
         fig.add_trace(
             go.Bar(
-                x=df["datetime"],
+                x=x_str,
                 y=df["Volume"],
                 name="Volym",
                 marker_color="rgba(100, 149, 237, 0.5)",
@@ -944,50 +1212,18 @@ class VisualizeHistory:
 
         # Lägg till köp- och säljmarkeringar om det finns trades
         if currency_trades:
-            history_start = df["datetime"].min()
-            history_end = df["datetime"].max()
-
-            buy_times, buy_prices, buy_labels = [], [], []
-            sell_times, sell_prices, sell_labels = [], [], []
-
-            last_buy_price: Optional[float] = None
-            sorted_trades = sorted(
-                currency_trades, key=lambda t: t.get("time") or 0
+            open_ms = df["Open_Time_ms"]
+            markers = self._trade_markers(
+                currency_trades, int(open_ms.min()), int(open_ms.max())
             )
-            for trade in sorted_trades:
-                trade_time_ms = trade.get("time")
-                if not trade_time_ms:
-                    continue
-                trade_dt = datetime.fromtimestamp(
-                    trade_time_ms / 1000, tz=timezone.utc
-                )
-                # Visa bara trades inom kurshistorikens tidsintervall
-                if not (history_start <= trade_dt <= history_end):
-                    continue
-
-                try:
-                    price = float(trade.get("price", 0))
-                except (ValueError, TypeError):
-                    continue
+            buys = markers[markers["is_buy"]]
+            sells = markers[~markers["is_buy"]]
 
-                is_buyer = trade.get("isBuyer", False)
-                if is_buyer:
-                    last_buy_price = price
-                    label = self._format_trade_label(trade)
-                    buy_times.append(trade_dt)
-                    buy_prices.append(price)
-                    buy_labels.append(label)
-                else:
-                    label = self._format_trade_label(trade, buy_price=last_buy_price)
-                    sell_times.append(trade_dt)
-                    sell_prices.append(price)
-                    sell_labels.append(label)
-
-            if buy_times:
+            if not buys.empty:
                 fig.add_trace(
                     go.Scatter(
-                        x=buy_times,
-                        y=buy_prices,
+                        x=buys["x"].to_numpy(),
+                        y=buys["y"].to_numpy(),
                         mode="markers",
                         name="Köp",
                         marker=dict(
@@ -996,17 +1232,17 @@ class VisualizeHistory:
                             color="#00c853",
                             line=dict(color="#ffffff", width=1),
                         ),
-                        text=buy_labels,
-                        hovertemplate="%{text}<extra></extra>",
+                        customdata=buys[TRADE_CUSTOMDATA_COLUMNS].to_numpy(),
+                        hovertemplate=TRADE_HOVERTEMPLATE,
                     ),
                     row=1, col=1,
                 )
 
-            if sell_times:
+            if not sells.empty:
                 fig.add_trace(
                     go.Scatter(
-                        x=sell_times,
-                        y=sell_prices,
+                        x=sells["x"].to_numpy(),
+                        y=sells["y"].to_numpy(),
                         mode="markers",
                         name="Sälj",
                         marker=dict(
@@ -1015,8 +1251,8 @@ class VisualizeHistory:
                             color="#d50000",
                             line=dict(color="#ffffff", width=1),
                         ),
-                        text=sell_labels,
-                        hovertemplate="%{text}<extra></extra>",
+                        customdata=sells[TRADE_CUSTOMDATA_COLUMNS].to_numpy(),
+                        hovertemplate=TRADE_HOVERTEMPLATE,
                     ),
                     row=1, col=1,
                 )
@@ -1085,14 +1321,15 @@ class VisualizeHistory:
             fig.update_xaxes(range=[one_month_ago, last_date], row=1, col=1)
 
         log.info("Chart built for %s", currency)
-        return fig.to_html(
-            full_html=False,
-            include_plotlyjs=False,
-            div_id=f"chart-{currency}",
-        )
+        return _figure_div(fig, f"chart-{currency}")
 
-    def _build_combined_html(self, charts: Dict[str, str]) -> str:
-        """Bygg kombinerat HTML-dokument med flikar för valutaval."""
+    def _iter_combined_html(self, charts: Dict[str, str]) -> Iterator[str]:
+        """
+        Bygg kombinerat HTML-dokument med flikar för valutaval, fragment för fragment.
+
+        Varje diagram-div lämnas ut som ett eget fragment så att anroparen kan
+        skriva dokumentet utan att först sätta ihop hela strängen i minnet.
+        """
         created_at = datetime.now(tz=ZoneInfo("Europe/Stockholm")).strftime("%Y-%m-%d %H:%M")
 
         # Separera valutaflikar från specialflikarna
@@ -1106,127 +1343,46 @@ class VisualizeHistory:
             + currency_keys
         )
 
-        def _tab_button(c: str, active: bool) -> str:
+        tab_parts: List[str] = []
+        for i, c in enumerate(all_keys):
             if c == "Performance":
                 extra_class = " vh-tab-portfolio"
             elif c == "Overview":
                 extra_class = " vh-tab-summary"
             else:
                 extra_class = ""
-            active_class = " vh-tab-active" if active else ""
-            return (
-                '<button class="vh-tab{extra}{active}" id="tab-{c}" '
-                'onclick="showChart(\'{c}\')">{c}</button>'.format(
-                    c=c, extra=extra_class, active=active_class
-                )
+            active_class = " vh-tab-active" if i == 0 else ""
+            tab_parts.append(
+                f'<button class="vh-tab{extra_class}{active_class}" id="tab-{c}" '
+                f"onclick=\"showChart('{c}')\">{c}</button>"
             )
-
-        tab_parts = [_tab_button(c, i == 0) for i, c in enumerate(all_keys)]
         # Lägg in en separator mellan specialflikarna och valutaflikarna
         if (has_portfolio or has_summary) and currency_keys:
             num_special = (1 if has_summary else 0) + (1 if has_portfolio else 0)
             tab_parts.insert(num_special, '<span class="vh-tab-sep"></span>')
-        tabs_html = "\n".join(tab_parts)
 
-        chart_sections = "\n".join(
-            '<div id="wrapper-{c}" style="display:{d}">{html}</div>'.format(
-                c=c,
-                d="" if i == 0 else "none",
-                html=charts[c],
-            )
-            for i, c in enumerate(all_keys)
-        )
-
-        key_json = ", ".join(f'"{c}"' for c in all_keys)
-
-        combined_js = (
-            "var _currencies = [" + key_json + "];\n"
-            "function _tabClass(x, active) {\n"
-            "  var cls = 'vh-tab';\n"
-            "  if (x === 'Performance') cls += ' vh-tab-portfolio';\n"
-            "  if (x === 'Overview') cls += ' vh-tab-summary';\n"
-            "  if (active) cls += ' vh-tab-active';\n"
-            "  return cls;\n"
-            "}\n"
-            "function applyLastMonth(chartId) {\n"
-            "  var el = document.getElementById(chartId);\n"
-            "  if (!el || !el.data || !el.data[0]) return;\n"
-            "  var xs = el.data[0].x;\n"
-            "  if (!xs || !xs.length) return;\n"
-            "  var lastDate = new Date(xs[xs.length - 1]);\n"
-            "  var startDate = new Date(lastDate);\n"
-            "  startDate.setMonth(startDate.getMonth() - 1);\n"
-            "  Plotly.relayout(el, {\n"
-            "    'xaxis.range[0]': startDate.toISOString(),\n"
-            "    'xaxis.range[1]': lastDate.toISOString(),\n"
-            "    'xaxis.rangeselector.active': 1\n"
-            "  });\n"
-            "}\n"
-            "function showChart(c) {\n"
-            "  _currencies.forEach(function(x) {\n"
-            "    var w = document.getElementById('wrapper-' + x);\n"
-            "    if (w) w.style.display = x === c ? '' : 'none';\n"
-            "    var t = document.getElementById('tab-' + x);\n"
-            "    if (t) t.className = _tabClass(x, x === c);\n"
-            "  });\n"
-            "  var el = document.getElementById('chart-' + c);\n"
-            "  if (el) {\n"
-            "    Plotly.Plots.resize(el);\n"
-            "    applyLastMonth('chart-' + c);\n"
-            "  }\n"
-            "}\n"
-            "window.addEventListener('load', function() {\n"
-            "  if (_currencies.length > 0) applyLastMonth('chart-' + _currencies[0]);\n"
-            "});\n"
-        )
-
-        return (
-            "<!DOCTYPE html>\n"
-            '<html lang="sv">\n'
-            "<head>\n"
-            '<meta charset="utf-8">\n'
-            '<meta name="viewport" content="width=device-width, initial-scale=1">\n'
-            "<title>Kurshistorik</title>\n"
-            f"<script>{get_plotlyjs()}</script>\n"
-            "<style>\n"
-            "body{background:#1a1a2e;color:#cdd6f4;font-family:sans-serif;margin:0;padding:0}\n"
-            ".vh-tabs{padding:0 20px;background:#16213e;border-bottom:1px solid #45475a;"
-            "display:flex;align-items:flex-end;gap:4px;overflow-x:auto;flex-wrap:nowrap;"
-            "-webkit-overflow-scrolling:touch}\n"
-            ".vh-tab{background:#2a2a3e;color:#cdd6f4;border:1px solid #45475a;"
-            "border-bottom:none;border-radius:6px 6px 0 0;padding:10px 20px;"
-            "font-size:15px;cursor:pointer;margin-bottom:-1px;transition:background 0.15s;"
-            "flex-shrink:0}\n"
-            ".vh-tab:hover{background:#3a3a5e}\n"
-            ".vh-tab-active{background:#1a1a2e;color:#89dceb;border-bottom:1px solid #1a1a2e}\n"
-            ".vh-tab-portfolio{color:#a6e3a1;border-color:#a6e3a1}\n"
-            ".vh-tab-portfolio.vh-tab-active{color:#a6e3a1}\n"
-            ".vh-tab-summary{color:#cba6f7;border-color:#cba6f7}\n"
-            ".vh-tab-summary.vh-tab-active{color:#cba6f7}\n"
-            ".vh-tab-sep{width:1px;background:#45475a;margin:6px 4px;align-self:stretch}\n"
-            ".vh-created-at{margin-left:auto;color:#4a5a80;font-size:11px;padding-bottom:10px;align-self:flex-end;white-space:nowrap}\n"
-            ".vh-sum-h2{color:#cdd6f4;margin-top:16px;font-size:18px}\n"
-            ".vh-sum-table{border-collapse:collapse;min-width:480px;font-size:14px}\n"
-            ".vh-sum-table th{background:#16213e;color:#89b4fa;padding:8px 16px;"
-            "text-align:left;border-bottom:2px solid #45475a;white-space:nowrap}\n"
-            ".vh-sum-table td{padding:7px 16px;border-bottom:1px solid #313244;color:#cdd6f4}\n"
-            ".vh-sum-table tr:hover td{background:#1e1e2e}\n"
-            ".vh-sum-buy{color:#a6e3a1;font-weight:bold}\n"
-            ".vh-sum-sell{color:#f38ba8;font-weight:bold}\n"
-            ".vh-sum-pos{color:#a6e3a1}\n"
-            ".vh-sum-neg{color:#f38ba8}\n"
-            "</style>\n"
-            "</head>\n"
-            "<body>\n"
-            '<div class="vh-tabs">\n'
-            f"{tabs_html}\n"
-            f'<span class="vh-created-at">{created_at}</span>\n'
-            "</div>\n"
-            f"{chart_sections}\n"
-            f"<script>{combined_js}</script>\n"
-            "</body>\n"
-            "</html>"
-        )
+        yield _HTML_HEAD
+        if self.cfg.visualize_plotly_cdn:
+            yield _plotly_cdn_script()
+        else:
+            yield "<script>"
+            yield _plotly_js()
+            yield "</script>\n"
+        yield _HTML_STYLE
+        yield '</head>\n<body>\n<div class="vh-tabs">\n'
+        yield "\n".join(tab_parts)
+        yield f'\n<span class="vh-created-at">{created_at}</span>\n</div>\n'
+
+        for i, c in enumerate(all_keys):
+            if i > 0:
+                yield "\n"
+            yield f'<div id="wrapper-{c}" style="display:{"" if i == 0 else "none"}">'
+            yield charts[c]
+            yield "</div>"
+
+        yield "\n<script>"
+        yield _COMBINED_JS.substitute(currencies=", ".join(f'"{c}"' for c in all_keys))
+        yield "</script>\n</body>\n</html>"
 
     def run(self) -> bool:
         """
@@ -1237,29 +1393,38 @@ class VisualizeHistory:
             True om minst ett diagram genererades framgångsrikt
         """
         log.info("=== Starting VisualizeHistory ===")
+        manifest = self._input_manifest()
+        if (
+            not self.cfg.visualize_force_regen
+            and self.html_file.exists()
+            and self._read_manifest() == manifest
+        ):
+            log.info("Inputs unchanged since last build - keeping %s", self.html_file)
+            # debug.csv avser senaste veckan räknat från nu och skrivs därför ändå
+            self._write_debug_csv_safe(self._read_trades(), self._read_history_frames())
+            return True
+
         trades = self._read_trades()
+        trades_by_currency = self._group_trades_by_currency(trades, self.cfg.currencies)
         charts: Dict[str, str] = {}
-        dfs: Dict[str, pd.DataFrame] = {}
+        dfs = self._read_history_frames()
+        # Manifestet skrivs bara om alla delar byggdes utan fel
+        complete = True
 
         for currency in self.cfg.currencies:
             try:
-                df = self._read_history(currency)
-                if df is not None and not df.empty:
-                    dfs[currency] = df
-                div = self.generate_chart(currency, trades)
-                if div is not None:
-                    charts[currency] = div
-                    log.info("Chart generated for %s", currency)
-                else:
-                    log.warning("Could not generate chart for %s", currency)
+                df = dfs.get(currency)
+                if df is None:
+                    log.warning("No price history for %s - skipping chart", currency)
+                    continue
+                charts[currency] = self.generate_chart(currency, trades_by_currency[currency], df)
+                log.info("Chart generated for %s", currency)
             except Exception as e:
+                complete = False
                 log.error("Unexpected error generating chart for %s: %s", currency, e)
 
         # Skriv debug-CSV oavsett om diagram genererats
-        try:
-            self._write_debug_csv(trades, dfs)
-        except Exception as e:
-            log.error("Error writing debug CSV: %s", e)
+        self._write_debug_csv_safe(trades, dfs)
 
         if not charts:
             log.info(
@@ -1277,26 +1442,54 @@ class VisualizeHistory:
             else:
                 log.info("No portfolio chart generated (no trades with holdings)")
         except Exception as e:
+            complete = False
             log.error("Unexpected error generating portfolio chart: %s", e)
 
         # Generera overview-flik
         try:
             charts["Overview"] = self.generate_summary_html(trades, dfs)
         except Exception as e:
+            complete = False
             log.error("Unexpected error generating overview: %s", e)
 
         self._ensure_dir(self.output_dir)
-        html_file = self.output_dir / "history_chart.html"
-        html_content = self._build_combined_html(charts)
+        html_file = self.html_file
+        gz_file = self.output_dir / "history_chart.html.gz"
 
+        # Ett gammalt manifest får inte överleva ett misslyckat bygge
+        self.manifest_file.unlink(missing_ok=True)
         try:
-            with open(html_file, "w", encoding="utf-8") as f:
-                f.write(html_content)
+            with ExitStack() as stack:
+                f = stack.enter_context(
+                    open(html_file, "w", encoding="utf-8", buffering=HTML_WRITE_BUFFER)
+                )
+                # Förkomprimerad kopia för statiska webbservrar (gzip_static e.d.)
+                gz = None
+                if self.cfg.compress_visualize:
+                    gz = stack.enter_context(
+                        gzip.open(gz_file, "wt", encoding="utf-8", compresslevel=6)
+                    )
+                for chunk in self._iter_combined_html(charts):
+                    f.write(chunk)
+                    if gz is not None:
+                        gz.write(chunk)
+            if not self.cfg.compress_visualize:
+                # Ta bort inaktuell kopia så att servern inte levererar gammalt innehåll
+                gz_file.unlink(missing_ok=True)
             log.info("Combined chart saved: %s", html_file)
         except Exception as e:
             log.error("Error saving combined chart: %s", e)
             return False
 
+        if complete:
+            try:
+                with open(self.manifest_file, "w", encoding="utf-8") as f:
+                    json.dump(manifest, f, indent=2)
+            except Exception as e:
+                log.warning("Could not write chart manifest: %s", e)
+        else:
+            log.warning("Chart built with errors - manifest not written, next run rebuilds")
+
         _special = {"Performance", "Overview"}
         log.info(
             "VisualizeHistory completed: %d/%d currency charts generated",
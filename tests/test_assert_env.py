@@ -97,6 +97,51 @@ class TestAssertEnv(unittest.TestCase):
 
         self.assertEqual(cfg.binance_base_url, "https://example.testnet")
 
+    def test_compress_visualize_defaults_to_false(self):
+        with patch.dict(os.environ, _base_env(), clear=True):
+            cfg = load_config_from_env()
+
+        self.assertFalse(cfg.compress_visualize)
+
+    def test_compress_visualize_can_be_enabled(self):
+        env = _base_env()
+        env["COMPRESS_VISUALIZE"] = "true"
+
+        with patch.dict(os.environ, env, clear=True):
+            cfg = load_config_from_env()
+
+        self.assertTrue(cfg.compress_visualize)
+
+    def test_visualize_force_regen_defaults_to_false(self):
+        with patch.dict(os.environ, _base_env(), clear=True):
+            cfg = load_config_from_env()
+
+        self.assertFalse(cfg.visualize_force_regen)
+
+    def test_visualize_force_regen_can_be_enabled(self):
+        env = _base_env()
+        env["VISUALIZE_FORCE_REGEN"] = "true"
+
+        with patch.dict(os.environ, env, clear=True):
+            cfg = load_config_from_env()
+
+        self.assertTrue(cfg.visualize_force_regen)
+
+    def test_visualize_plotly_cdn_defaults_to_false(self):
+        with patch.dict(os.environ, _base_env(), clear=True):
+            cfg = load_config_from_env()
+
+        self.assertFalse(cfg.visualize_plotly_cdn)
+
+    def test_visualize_plotly_cdn_can_be_enabled(self):
+        env = _base_env()
+        env["VISUALIZE_PLOTLY_CDN"] = "true"
+
+        with patch.dict(os.environ, env, clear=True):
+            cfg = load_config_from_env()
+
+        self.assertTrue(cfg.visualize_plotly_cdn)
+
 
 if __name__ == "__main__":
     unittest.main()
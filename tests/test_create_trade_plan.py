@@ -10,39 +10,73 @@ These tests validate that the trade plan generation logic works correctly:
 - Falls back to 1 BUY if split amounts are below threshold
 - Saves trade plan correctly
 """
+import dataclasses
+import os
 import unittest
 import tempfile
 import shutil
 from pathlib import Path
-import pandas as pd
-import csv
-import sys
-
-# Add project root to path
-project_root = Path(__file__).parent.parent
-sys.path.insert(0, str(project_root))
 
 from src.create_trade_plan import CreateTradePlan
 from src.config import Config
 
+# RAM-backed tmpfs when available, so fixture I/O and cleanup skip the disk
+_TMP_ROOT = '/dev/shm' if os.access('/dev/shm', os.W_OK) else None
+
+_PORTFOLIO_FIELDS = (
+    'currency', 'balance', 'current_rate_usdc', 'current_value_usdc',
+    'previous_rate_usdc', 'percentage_change', 'value_change_usdc',
+)
+_RECOMMENDATION_FIELDS = (
+    'currency', 'current_value_usdc', 'percentage_change', 'ta_score',
+    'ta_step', 'ta_reason', 'risk_step', 'risk_action',
+    'liquidity_step', 'liquidity_pass', 'decision_step',
+    'decision_reason', 'priority',
+)
+
+
+# Shared portfolio rows; tests only spell out the fields that differ
+_USDC_ROW = {'currency': 'USDC', 'balance': 50.0, 'current_rate_usdc': 1.0,
+             'current_value_usdc': 50.0, 'previous_rate_usdc': 1.0,
+             'percentage_change': 0.0, 'value_change_usdc': 0.0}
+_BTC_ROW = {'currency': 'BTC', 'balance': 0.005, 'current_rate_usdc': 50000.0,
+            'current_value_usdc': 250.0, 'previous_rate_usdc': 49000.0,
+            'percentage_change': 2.04, 'value_change_usdc': 5.0}
+_ETH_EMPTY_ROW = {'currency': 'ETH', 'balance': 0.0, 'current_rate_usdc': 3000.0,
+                  'current_value_usdc': 0.0, 'previous_rate_usdc': 3000.0,
+                  'percentage_change': 0.0, 'value_change_usdc': 0.0}
+
+
+def _usdc_row(balance: float) -> dict:
+    """Return a USDC portfolio row holding the given balance."""
+    return {**_USDC_ROW, 'balance': balance, 'current_value_usdc': balance}
+
+
+def _csv_bytes(fieldnames, rows) -> bytes:
+    """Serialize simple fixture rows (no commas or quotes) to CSV bytes."""
+    lines = [','.join(fieldnames)]
+    lines.extend(','.join(str(row.get(field, '')) for field in fieldnames) for row in rows)
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
 
 class TestCreateTradePlan(unittest.TestCase):
     """Tests for CreateTradePlan class."""
 
-    def setUp(self):
-        """Create temporary test environment."""
-        self.test_dir = tempfile.mkdtemp()
-        self.data_root = Path(self.test_dir)
-        
+    @classmethod
+    def setUpClass(cls):
+        """Create temporary test environment shared by all tests in the class."""
+        cls.test_dir = tempfile.mkdtemp(dir=_TMP_ROOT)
+        cls.data_root = Path(cls.test_dir)
+
         # Create necessary directories
-        self.summarised_dir = self.data_root / "summarised"
-        self.output_dir = self.data_root / "output" / "rebalance"
-        
-        self.summarised_dir.mkdir(parents=True, exist_ok=True)
-        self.output_dir.mkdir(parents=True, exist_ok=True)
+        cls.summarised_dir = cls.data_root / "summarised"
+        cls.output_dir = cls.data_root / "output" / "rebalance"
+
+        cls.summarised_dir.mkdir(parents=True, exist_ok=True)
+        cls.output_dir.mkdir(parents=True, exist_ok=True)
 
         # Create mock config
-        self.cfg = Config(
+        cls._base_cfg = Config(
             currencies=["BTC", "ETH", "SOL"],
             binance_secret="test_secret",
             binance_key="test_key",
@@ -52,7 +86,7 @@ class TestCreateTradePlan(unittest.TestCase):
             binance_my_trades_endpoint="/api/v3/myTrades",
             binance_trading_url="https://api.binance.com/api/v3/order",
             dry_run=True,
-            data_area_root_dir=str(self.data_root),
+            data_area_root_dir=str(cls.data_root),
             currency_history_period="1h",
             currency_history_nof_elements=300,
             trade_threshold=100.0,  # 100 USDC threshold
@@ -67,20 +101,27 @@ class TestCreateTradePlan(unittest.TestCase):
             raw_env={}
         )
 
-    def tearDown(self):
+    @classmethod
+    def tearDownClass(cls):
         """Clean up temporary test environment."""
-        shutil.rmtree(self.test_dir, ignore_errors=True)
+        shutil.rmtree(cls.test_dir, ignore_errors=True)
+
+    def setUp(self):
+        """Remove fixture files left by the previous test and create config."""
+        for path in (
+            self.summarised_dir / "portfolio.csv",
+            self.output_dir / "recommendations.csv",
+            self.output_dir / "trade_plan.csv",
+        ):
+            path.unlink(missing_ok=True)
+
+        # Fresh copy so tests can change dry_run without affecting each other
+        self.cfg = dataclasses.replace(self._base_cfg)
 
     def _create_portfolio_summary(self, portfolio_data: list):
         """Create a portfolio summary CSV file for testing."""
         portfolio_file = self.summarised_dir / "portfolio.csv"
-        
-        with open(portfolio_file, 'w', newline='', encoding='utf-8') as f:
-            fieldnames = ['currency', 'balance', 'current_rate_usdc', 'current_value_usdc',
-                         'previous_rate_usdc', 'percentage_change', 'value_change_usdc']
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(portfolio_data)
+        portfolio_file.write_bytes(_csv_bytes(_PORTFOLIO_FIELDS, portfolio_data))
 
     def _create_recommendations(self, recommendations_data: list):
         """Create a recommendations CSV file for testing."""
@@ -92,162 +133,87 @@ class TestCreateTradePlan(unittest.TestCase):
                 normalized['decision_step'] = normalized['signal']
             rows.append(normalized)
 
-        fieldnames = [
-            'currency', 'current_value_usdc', 'percentage_change', 'ta_score',
-            'ta_step', 'ta_reason', 'risk_step', 'risk_action',
-            'liquidity_step', 'liquidity_pass', 'decision_step',
-            'decision_reason', 'priority',
-        ]
+        fieldnames = list(_RECOMMENDATION_FIELDS)
         if any('signal' in row for row in rows):
             fieldnames.append('signal')
 
-        with open(recommendations_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(rows)
+        recommendations_file.write_bytes(_csv_bytes(fieldnames, rows))
 
     def _read_trade_plan(self) -> list:
         """Read the generated trade plan."""
         trade_plan_file = self.output_dir / "trade_plan.csv"
-        
-        with open(trade_plan_file, 'r', newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            return list(reader)
+        lines = trade_plan_file.read_bytes().decode('utf-8').splitlines()
+        header = lines[0].split(',')
+        return [dict(zip(header, line.split(','))) for line in lines[1:]]
 
-    def test_sell_above_threshold(self):
-        """Test SELL when value exceeds threshold."""
-        # Create portfolio with BTC above threshold
-        portfolio = [
-            {'currency': 'USDC', 'balance': 50.0, 'current_rate_usdc': 1.0, 
-             'current_value_usdc': 50.0, 'previous_rate_usdc': 1.0,
-             'percentage_change': 0.0, 'value_change_usdc': 0.0},
-            {'currency': 'BTC', 'balance': 0.005, 'current_rate_usdc': 50000.0, 
-             'current_value_usdc': 250.0, 'previous_rate_usdc': 49000.0,
-             'percentage_change': 2.04, 'value_change_usdc': 5.0}
-        ]
-        self._create_portfolio_summary(portfolio)
-        
-        # Create SELL recommendation for BTC
-        recommendations = [
-            {'currency': 'BTC', 'percentage_change': '2.04', 'ta_score': -2, 'signal': 'SELL'}
-        ]
-        self._create_recommendations(recommendations)
-        
-        # Generate trade plan
-        creator = CreateTradePlan(self.cfg)
-        success = creator.run()
-        
-        self.assertTrue(success)
-        
-        # Verify trade plan
-        trade_plan = self._read_trade_plan()
-        self.assertEqual(len(trade_plan), 1)
-        self.assertEqual(trade_plan[0]['action'], 'SELL')
-        self.assertEqual(trade_plan[0]['currency'], 'BTC')
-        self.assertEqual(float(trade_plan[0]['amount']), 0.005)
-        self.assertEqual(float(trade_plan[0]['value_usdc']), 250.0)
+    # (name, portfolio, recommendations, expected trade plan)
+    SINGLE_STEP_CASES = [
+        (
+            "sell_above_threshold",
+            [
+                _USDC_ROW,
+                _BTC_ROW,
+            ],
+            [{'currency': 'BTC', 'percentage_change': '2.04', 'ta_score': -2, 'signal': 'SELL'}],
+            [{'action': 'SELL', 'currency': 'BTC', 'amount': '0.00500000', 'value_usdc': '250.00'}],
+        ),
+        (
+            "sell_below_threshold_skipped",
+            [
+                _USDC_ROW,
+                {**_BTC_ROW, 'balance': 0.001, 'current_value_usdc': 50.0, 'value_change_usdc': 1.0},
+            ],
+            [{'currency': 'BTC', 'percentage_change': '2.04', 'ta_score': -2, 'signal': 'SELL'}],
+            [],
+        ),
+        (
+            "buy_with_sufficient_funds",
+            [
+                _usdc_row(500.0),
+                _ETH_EMPTY_ROW,
+            ],
+            [{'currency': 'ETH', 'percentage_change': '0.00', 'ta_score': 2, 'signal': 'BUY'}],
+            [{'action': 'BUY', 'currency': 'ETH', 'amount': 'ALL', 'value_usdc': '500.00'}],
+        ),
+        (
+            "buy_skipped_insufficient_funds",
+            [
+                _USDC_ROW,
+                _ETH_EMPTY_ROW,
+            ],
+            [{'currency': 'ETH', 'percentage_change': '0.00', 'ta_score': 2, 'signal': 'BUY'}],
+            [],
+        ),
+        (
+            "empty_recommendations",
+            [
+                _usdc_row(500.0),
+            ],
+            [],
+            [],
+        ),
+    ]
 
-    def test_sell_below_threshold_skipped(self):
-        """Test SELL skipped when value is below threshold."""
-        # Create portfolio with BTC below threshold
-        portfolio = [
-            {'currency': 'USDC', 'balance': 50.0, 'current_rate_usdc': 1.0, 
-             'current_value_usdc': 50.0, 'previous_rate_usdc': 1.0,
-             'percentage_change': 0.0, 'value_change_usdc': 0.0},
-            {'currency': 'BTC', 'balance': 0.001, 'current_rate_usdc': 50000.0, 
-             'current_value_usdc': 50.0, 'previous_rate_usdc': 49000.0,
-             'percentage_change': 2.04, 'value_change_usdc': 1.0}
-        ]
-        self._create_portfolio_summary(portfolio)
-        
-        # Create SELL recommendation for BTC
-        recommendations = [
-            {'currency': 'BTC', 'percentage_change': '2.04', 'ta_score': -2, 'signal': 'SELL'}
-        ]
-        self._create_recommendations(recommendations)
-        
-        # Generate trade plan
-        creator = CreateTradePlan(self.cfg)
-        success = creator.run()
-        
-        self.assertTrue(success)
-        
-        # Verify trade plan is empty (SELL was skipped)
-        trade_plan = self._read_trade_plan()
-        self.assertEqual(len(trade_plan), 0)
+    def test_single_step_cases(self):
+        """Test single SELL/BUY threshold cases and empty recommendations."""
+        for name, portfolio, recommendations, expected in self.SINGLE_STEP_CASES:
+            with self.subTest(name=name):
+                self._create_portfolio_summary(portfolio)
+                self._create_recommendations(recommendations)
 
-    def test_buy_with_sufficient_funds(self):
-        """Test BUY when liquid funds exceed threshold."""
-        # Create portfolio with sufficient USDC
-        portfolio = [
-            {'currency': 'USDC', 'balance': 500.0, 'current_rate_usdc': 1.0, 
-             'current_value_usdc': 500.0, 'previous_rate_usdc': 1.0,
-             'percentage_change': 0.0, 'value_change_usdc': 0.0},
-            {'currency': 'ETH', 'balance': 0.0, 'current_rate_usdc': 3000.0, 
-             'current_value_usdc': 0.0, 'previous_rate_usdc': 3000.0,
-             'percentage_change': 0.0, 'value_change_usdc': 0.0}
-        ]
-        self._create_portfolio_summary(portfolio)
-        
-        # Create BUY recommendation for ETH
-        recommendations = [
-            {'currency': 'ETH', 'percentage_change': '0.00', 'ta_score': 2, 'signal': 'BUY'}
-        ]
-        self._create_recommendations(recommendations)
-        
-        # Generate trade plan
-        creator = CreateTradePlan(self.cfg)
-        success = creator.run()
-        
-        self.assertTrue(success)
-        
-        # Verify trade plan
-        trade_plan = self._read_trade_plan()
-        self.assertEqual(len(trade_plan), 1)
-        self.assertEqual(trade_plan[0]['action'], 'BUY')
-        self.assertEqual(trade_plan[0]['currency'], 'ETH')
-        self.assertEqual(trade_plan[0]['amount'], 'ALL')
-        self.assertEqual(float(trade_plan[0]['value_usdc']), 500.0)
+                # Generate trade plan
+                creator = CreateTradePlan(self.cfg)
+                success = creator.run()
 
-    def test_buy_skipped_insufficient_funds(self):
-        """Test BUY skipped when liquid funds are below threshold."""
-        # Create portfolio with insufficient USDC
-        portfolio = [
-            {'currency': 'USDC', 'balance': 50.0, 'current_rate_usdc': 1.0, 
-             'current_value_usdc': 50.0, 'previous_rate_usdc': 1.0,
-             'percentage_change': 0.0, 'value_change_usdc': 0.0},
-            {'currency': 'ETH', 'balance': 0.0, 'current_rate_usdc': 3000.0, 
-             'current_value_usdc': 0.0, 'previous_rate_usdc': 3000.0,
-             'percentage_change': 0.0, 'value_change_usdc': 0.0}
-        ]
-        self._create_portfolio_summary(portfolio)
-        
-        # Create BUY recommendation for ETH
-        recommendations = [
-            {'currency': 'ETH', 'percentage_change': '0.00', 'ta_score': 2, 'signal': 'BUY'}
-        ]
-        self._create_recommendations(recommendations)
-        
-        # Generate trade plan
-        creator = CreateTradePlan(self.cfg)
-        success = creator.run()
-        
-        self.assertTrue(success)
-        
-        # Verify trade plan is empty (BUY was skipped)
-        trade_plan = self._read_trade_plan()
-        self.assertEqual(len(trade_plan), 0)
+                self.assertTrue(success)
+                self.assertEqual(self._read_trade_plan(), expected)
 
     def test_multiple_sells_two_buys(self):
         """Test multiple SELLs followed by two BUYs with equal allocation."""
         # Create portfolio
         portfolio = [
-            {'currency': 'USDC', 'balance': 50.0, 'current_rate_usdc': 1.0, 
-             'current_value_usdc': 50.0, 'previous_rate_usdc': 1.0,
-             'percentage_change': 0.0, 'value_change_usdc': 0.0},
-            {'currency': 'BTC', 'balance': 0.005, 'current_rate_usdc': 50000.0, 
-             'current_value_usdc': 250.0, 'previous_rate_usdc': 49000.0,
-             'percentage_change': 2.04, 'value_change_usdc': 5.0},
+            _USDC_ROW,
+            _BTC_ROW,
             {'currency': 'ETH', 'balance': 0.1, 'current_rate_usdc': 3000.0, 
              'current_value_usdc': 300.0, 'previous_rate_usdc': 2900.0,
              'percentage_change': 3.45, 'value_change_usdc': 10.0},
@@ -289,42 +255,13 @@ class TestCreateTradePlan(unittest.TestCase):
         self.assertEqual(float(buys[0]['value_usdc']), 300.0)
         self.assertEqual(float(buys[1]['value_usdc']), 300.0)
 
-    def test_empty_recommendations(self):
-        """Test with empty recommendations."""
-        # Create portfolio
-        portfolio = [
-            {'currency': 'USDC', 'balance': 500.0, 'current_rate_usdc': 1.0, 
-             'current_value_usdc': 500.0, 'previous_rate_usdc': 1.0,
-             'percentage_change': 0.0, 'value_change_usdc': 0.0}
-        ]
-        self._create_portfolio_summary(portfolio)
-        
-        # Create empty recommendations
-        self._create_recommendations([])
-        
-        # Generate trade plan
-        creator = CreateTradePlan(self.cfg)
-        success = creator.run()
-        
-        self.assertTrue(success)
-        
-        # Verify trade plan is empty
-        trade_plan = self._read_trade_plan()
-        self.assertEqual(len(trade_plan), 0)
-
     def test_liquid_funds_calculation_after_sells(self):
         """Test that liquid funds are correctly updated after SELLs."""
         # Create portfolio with some USDC and holdings to sell
         portfolio = [
-            {'currency': 'USDC', 'balance': 100.0, 'current_rate_usdc': 1.0, 
-             'current_value_usdc': 100.0, 'previous_rate_usdc': 1.0,
-             'percentage_change': 0.0, 'value_change_usdc': 0.0},
-            {'currency': 'BTC', 'balance': 0.004, 'current_rate_usdc': 50000.0, 
-             'current_value_usdc': 200.0, 'previous_rate_usdc': 49000.0,
-             'percentage_change': 2.04, 'value_change_usdc': 4.0},
-            {'currency': 'ETH', 'balance': 0.0, 'current_rate_usdc': 3000.0, 
-             'current_value_usdc': 0.0, 'previous_rate_usdc': 3000.0,
-             'percentage_change': 0.0, 'value_change_usdc': 0.0}
+            _usdc_row(100.0),
+            {**_BTC_ROW, 'balance': 0.004, 'current_value_usdc': 200.0, 'value_change_usdc': 4.0},
+            _ETH_EMPTY_ROW
         ]
         self._create_portfolio_summary(portfolio)
         
@@ -360,9 +297,7 @@ class TestCreateTradePlan(unittest.TestCase):
         """Test fallback to single BUY when split allocation is below threshold."""
         # Create portfolio with 180 USDC (split = 90, which is below threshold of 100)
         portfolio = [
-            {'currency': 'USDC', 'balance': 180.0, 'current_rate_usdc': 1.0, 
-             'current_value_usdc': 180.0, 'previous_rate_usdc': 1.0,
-             'percentage_change': 0.0, 'value_change_usdc': 0.0}
+            _usdc_row(180.0)
         ]
         self._create_portfolio_summary(portfolio)
         
@@ -391,9 +326,7 @@ class TestCreateTradePlan(unittest.TestCase):
         """Test 2 BUYs with equal allocation when both exceed threshold."""
         # Create portfolio with 400 USDC (split = 200 each, both > threshold 100)
         portfolio = [
-            {'currency': 'USDC', 'balance': 400.0, 'current_rate_usdc': 1.0, 
-             'current_value_usdc': 400.0, 'previous_rate_usdc': 1.0,
-             'percentage_change': 0.0, 'value_change_usdc': 0.0}
+            _usdc_row(400.0)
         ]
         self._create_portfolio_summary(portfolio)
         
@@ -424,9 +357,7 @@ class TestCreateTradePlan(unittest.TestCase):
         """Test that only the first 2 BUY candidates are used when 3+ are available."""
         # Create portfolio with 600 USDC
         portfolio = [
-            {'currency': 'USDC', 'balance': 600.0, 'current_rate_usdc': 1.0, 
-             'current_value_usdc': 600.0, 'previous_rate_usdc': 1.0,
-             'percentage_change': 0.0, 'value_change_usdc': 0.0}
+            _usdc_row(600.0)
         ]
         self._create_portfolio_summary(portfolio)
         
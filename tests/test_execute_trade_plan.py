@@ -8,36 +8,81 @@ These tests validate that trade execution logic works correctly:
 - Executes trades in dry-run mode (logging only)
 - Executes trades in live mode (with mocked CCXT broker)
 """
+import dataclasses
+import os
 import unittest
 import tempfile
 import shutil
 from pathlib import Path
-import csv
-import sys
-from unittest.mock import MagicMock, patch, call
-
-# Add project root to path
-project_root = Path(__file__).parent.parent
-sys.path.insert(0, str(project_root))
+from contextlib import contextmanager
+from unittest.mock import patch
 
 from src.execute_trade_plan import ExecuteTradePlan, CCXTBroker
 from src.config import Config
 
+# RAM-backed tmpfs when available, so fixture I/O and cleanup skip the disk
+_TMP_ROOT = '/dev/shm' if os.access('/dev/shm', os.W_OK) else None
+
+_TRADE_PLAN_FIELDS = ('action', 'currency', 'amount', 'value_usdc')
+_TRADE_PLAN_HEADER = ','.join(_TRADE_PLAN_FIELDS)
+
+
+class _FakeBroker:
+    """Lightweight CCXTBroker stand-in that only records calls."""
+
+    def __init__(self):
+        self.exchange_info = [
+            {'symbol': 'BTC/USDC', 'active': True},
+            {'symbol': 'ETH/USDC', 'active': True}
+        ]
+        self.order_error = None
+        self.fetch_exchange_info_calls = 0
+        self.market_buy_calls = []
+        self.market_sell_calls = []
+
+    def fetch_exchange_info(self):
+        self.fetch_exchange_info_calls += 1
+        return self.exchange_info
+
+    def market_buy(self, symbol, quote_amount):
+        self.market_buy_calls.append((symbol, quote_amount))
+        if self.order_error is not None:
+            raise self.order_error
+        return {'id': 'buy_456'}
+
+    def market_sell(self, symbol, base_quantity):
+        self.market_sell_calls.append((symbol, base_quantity))
+        if self.order_error is not None:
+            raise self.order_error
+        return {'id': 'sell_123'}
+
+
+class _FakeExchange:
+    """Lightweight ccxt exchange stand-in for CCXTBroker construction tests."""
+
+    def __init__(self):
+        self.urls = {}
+        self.sandbox_mode_calls = []
+
+    def set_sandbox_mode(self, enabled):
+        self.sandbox_mode_calls.append(enabled)
+
 
 class TestExecuteTradePlan(unittest.TestCase):
     """Tests for ExecuteTradePlan class."""
 
-    def setUp(self):
-        """Create temporary test environment."""
-        self.test_dir = tempfile.mkdtemp()
-        self.data_root = Path(self.test_dir)
-        
+    @classmethod
+    def setUpClass(cls):
+        """Create temporary test environment shared by all tests in the class."""
+        cls.test_dir = tempfile.mkdtemp(dir=_TMP_ROOT)
+        cls.data_root = Path(cls.test_dir)
+
         # Create necessary directories
-        self.output_dir = self.data_root / "output" / "rebalance"
-        self.output_dir.mkdir(parents=True, exist_ok=True)
+        cls.output_dir = cls.data_root / "output" / "rebalance"
+        cls.output_dir.mkdir(parents=True, exist_ok=True)
 
         # Create mock config
-        self.cfg = Config(
+        cls._base_cfg = Config(
             currencies=["BTC", "ETH", "SOL"],
             binance_secret="test_secret",
             binance_key="test_key",
@@ -47,7 +92,7 @@ class TestExecuteTradePlan(unittest.TestCase):
             binance_my_trades_endpoint="/api/v3/myTrades",
             binance_trading_url="https://api.binance.com/api/v3/order",
             dry_run=True,
-            data_area_root_dir=str(self.data_root),
+            data_area_root_dir=str(cls.data_root),
             currency_history_period="1h",
             currency_history_nof_elements=300,
             trade_threshold=100.0,
@@ -62,19 +107,32 @@ class TestExecuteTradePlan(unittest.TestCase):
             raw_env={}
         )
 
-    def tearDown(self):
+    @classmethod
+    def tearDownClass(cls):
         """Clean up temporary test environment."""
-        shutil.rmtree(self.test_dir, ignore_errors=True)
+        shutil.rmtree(cls.test_dir, ignore_errors=True)
+
+    def setUp(self):
+        """Remove the trade plan left by the previous test and create config."""
+        (self.output_dir / "trade_plan.csv").unlink(missing_ok=True)
+
+        # Fresh copy so tests can change dry_run without affecting each other
+        self.cfg = dataclasses.replace(self._base_cfg)
+
+    @contextmanager
+    def _patched_broker(self):
+        """Patch CCXTBroker and yield a fake broker with exchange info preset."""
+        with patch('src.execute_trade_plan.CCXTBroker') as MockBroker:
+            broker = _FakeBroker()
+            MockBroker.return_value = broker
+            yield broker
 
     def _create_trade_plan(self, trades: list):
         """Create a trade plan CSV file for testing."""
         trade_plan_file = self.output_dir / "trade_plan.csv"
-        
-        with open(trade_plan_file, 'w', newline='', encoding='utf-8') as f:
-            fieldnames = ['action', 'currency', 'amount', 'value_usdc']
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(trades)
+        lines = [_TRADE_PLAN_HEADER]
+        lines.extend(','.join(trade[field] for field in _TRADE_PLAN_FIELDS) for trade in trades)
+        trade_plan_file.write_bytes(('\n'.join(lines) + '\n').encode('utf-8'))
 
     def test_read_trade_plan(self):
         """Test reading trade plan from file."""
@@ -117,17 +175,16 @@ class TestExecuteTradePlan(unittest.TestCase):
 
     def test_execute_trades_dry_run(self):
         """Test executing trades in dry run mode."""
-        # Create test trade plan
         trades = [
             {'action': 'SELL', 'currency': 'BTC', 'amount': '0.005', 'value_usdc': '250.00'},
             {'action': 'BUY', 'currency': 'ETH', 'amount': 'ALL', 'value_usdc': '300.00'}
         ]
-        self._create_trade_plan(trades)
         
-        # Execute trades in dry run mode
+        # Execute trades in dry run mode (file round-trip is covered by test_read_trade_plan)
         self.cfg.dry_run = True
         executor = ExecuteTradePlan(self.cfg)
-        success = executor.execute_trades()
+        with patch.object(ExecuteTradePlan, '_read_trade_plan', return_value=trades):
+            success = executor.execute_trades()
         
         self.assertTrue(success)
 
@@ -144,19 +201,7 @@ class TestExecuteTradePlan(unittest.TestCase):
         self.cfg.dry_run = False
         
         # Mock CCXTBroker
-        with patch('src.execute_trade_plan.CCXTBroker') as MockBroker:
-            mock_broker_instance = MagicMock()
-            MockBroker.return_value = mock_broker_instance
-            
-            # Mock exchange info
-            mock_broker_instance.fetch_exchange_info.return_value = [
-                {'symbol': 'BTC/USDC', 'active': True},
-                {'symbol': 'ETH/USDC', 'active': True}
-            ]
-            
-            # Mock order responses
-            mock_broker_instance.market_sell.return_value = {'id': 'sell_123'}
-            mock_broker_instance.market_buy.return_value = {'id': 'buy_456'}
+        with self._patched_broker() as broker:
             
             # Execute trades
             executor = ExecuteTradePlan(self.cfg)
@@ -165,17 +210,15 @@ class TestExecuteTradePlan(unittest.TestCase):
             self.assertTrue(success)
             
             # Verify broker methods were called
-            mock_broker_instance.fetch_exchange_info.assert_called_once()
-            mock_broker_instance.market_sell.assert_called_once()
-            mock_broker_instance.market_buy.assert_called_once()
+            self.assertEqual(broker.fetch_exchange_info_calls, 1)
+            self.assertEqual(len(broker.market_sell_calls), 1)
+            self.assertEqual(len(broker.market_buy_calls), 1)
 
     def test_execute_empty_trade_plan(self):
         """Test executing empty trade plan."""
-        # Create empty trade plan
-        self._create_trade_plan([])
-        
         executor = ExecuteTradePlan(self.cfg)
-        success = executor.execute_trades()
+        with patch.object(ExecuteTradePlan, '_read_trade_plan', return_value=[]):
+            success = executor.execute_trades()
         
         self.assertTrue(success)
 
@@ -187,10 +230,7 @@ class TestExecuteTradePlan(unittest.TestCase):
         # Mock exchange info validation to verify it's NOT called
         self.cfg.dry_run = False
         
-        with patch('src.execute_trade_plan.CCXTBroker') as MockBroker:
-            mock_broker_instance = MagicMock()
-            MockBroker.return_value = mock_broker_instance
-            
+        with self._patched_broker() as broker:
             executor = ExecuteTradePlan(self.cfg)
             success = executor.run()
             
@@ -198,7 +238,7 @@ class TestExecuteTradePlan(unittest.TestCase):
             self.assertTrue(success)
             
             # Verify exchange info validation was NOT called (early exit)
-            mock_broker_instance.fetch_exchange_info.assert_not_called()
+            self.assertEqual(broker.fetch_exchange_info_calls, 0)
 
     def test_validate_exchange_info_dry_run(self):
         """Test exchange info validation in dry run mode."""
@@ -213,57 +253,57 @@ class TestExecuteTradePlan(unittest.TestCase):
         """Test exchange info validation in live mode."""
         self.cfg.dry_run = False
         
-        with patch('src.execute_trade_plan.CCXTBroker') as MockBroker:
-            mock_broker_instance = MagicMock()
-            MockBroker.return_value = mock_broker_instance
-            
-            # Mock exchange info
-            mock_broker_instance.fetch_exchange_info.return_value = [
-                {'symbol': 'BTC/USDC', 'active': True}
-            ]
-            
+        with self._patched_broker() as broker:
             executor = ExecuteTradePlan(self.cfg)
             result = executor._validate_exchange_info()
             
             self.assertTrue(result)
-            mock_broker_instance.fetch_exchange_info.assert_called_once()
+            self.assertEqual(broker.fetch_exchange_info_calls, 1)
+
+    def test_run_fetches_exchange_info_once(self):
+        """Test that a full live run() fetches exchange info at most once."""
+        trades = [
+            {'action': 'SELL', 'currency': 'BTC', 'amount': '0.005', 'value_usdc': '250.00'},
+            {'action': 'BUY', 'currency': 'ETH', 'amount': 'ALL', 'value_usdc': '300.00'}
+        ]
+        self._create_trade_plan(trades)
+        self.cfg.dry_run = False
+
+        with self._patched_broker() as broker:
+            executor = ExecuteTradePlan(self.cfg)
+            self.assertTrue(executor.run())
+            self.assertTrue(executor._validate_exchange_info())
+
+            self.assertLessEqual(broker.fetch_exchange_info_calls, 1)
 
     def test_execute_trade_live_with_failure(self):
         """Test handling trade execution failure in live mode."""
-        # Create test trade plan
         trades = [
             {'action': 'SELL', 'currency': 'BTC', 'amount': '0.005', 'value_usdc': '250.00'}
         ]
-        self._create_trade_plan(trades)
         
         self.cfg.dry_run = False
         
-        with patch('src.execute_trade_plan.CCXTBroker') as MockBroker:
-            mock_broker_instance = MagicMock()
-            MockBroker.return_value = mock_broker_instance
-            
-            # Mock exchange info
-            mock_broker_instance.fetch_exchange_info.return_value = [
-                {'symbol': 'BTC/USDC', 'active': True}
-            ]
-            
+        with self._patched_broker() as broker, \
+                patch.object(ExecuteTradePlan, '_read_trade_plan', return_value=trades):
             # Mock trade failure
-            mock_broker_instance.market_sell.side_effect = Exception("Network error")
+            broker.order_error = Exception("Network error")
             
             executor = ExecuteTradePlan(self.cfg)
             success = executor.execute_trades()
             
             # Should fail due to trade error
             self.assertFalse(success)
+            self.assertEqual(len(broker.market_sell_calls), 1)
 
 
 class TestCCXTBroker(unittest.TestCase):
     """Tests for CCXTBroker class."""
     
-    def test_ccxt_broker_initialization(self):
-        """Test CCXTBroker initialization."""
+    def test_ccxt_broker_initialization_and_time_sync(self):
+        """Test CCXTBroker initialization with time synchronization enabled."""
         with patch('src.execute_trade_plan.ccxt.binance') as mock_binance:
-            mock_exchange = MagicMock()
+            mock_exchange = _FakeExchange()
             mock_binance.return_value = mock_exchange
             
             broker = CCXTBroker(
@@ -274,39 +314,20 @@ class TestCCXTBroker(unittest.TestCase):
             )
             
             self.assertIsNotNone(broker.exchange)
+            self.assertEqual(mock_exchange.sandbox_mode_calls, [])
             mock_binance.assert_called_once()
-            mock_exchange.set_sandbox_mode.assert_not_called()
-    
-    def test_ccxt_broker_time_synchronization(self):
-        """Test that CCXTBroker is initialized with time synchronization enabled."""
-        with patch('src.execute_trade_plan.ccxt.binance') as mock_binance:
-            mock_exchange = MagicMock()
-            mock_binance.return_value = mock_exchange
-            
-            broker = CCXTBroker(
-                api_key="test_key",
-                api_secret="test_secret",
-                base_url="https://api.binance.com",
-                api_env="live",
-            )
             
-            # Verify that adjustForTimeDifference is set to True
-            mock_binance.assert_called_once()
+            # ccxt.binance must get a config dict with adjustForTimeDifference enabled
             call_args = mock_binance.call_args
-            self.assertIsNotNone(call_args, "ccxt.binance should have been called")
-            
-            # Check if called with positional argument (dict)
-            if call_args[0]:
-                config_dict = call_args[0][0]
-                self.assertTrue(config_dict.get('adjustForTimeDifference'), 
-                              "adjustForTimeDifference should be True to fix timestamp sync issues")
-            else:
-                self.fail("ccxt.binance was not called with expected arguments")
+            self.assertTrue(call_args[0], "ccxt.binance was not called with expected arguments")
+            config_dict = call_args[0][0]
+            self.assertTrue(config_dict.get('adjustForTimeDifference'), 
+                          "adjustForTimeDifference should be True to fix timestamp sync issues")
 
     def test_ccxt_broker_testnet_enables_sandbox_mode(self):
         """Test that testnet mode enables CCXT sandbox mode."""
         with patch('src.execute_trade_plan.ccxt.binance') as mock_binance:
-            mock_exchange = MagicMock()
+            mock_exchange = _FakeExchange()
             mock_binance.return_value = mock_exchange
 
             broker = CCXTBroker(
@@ -317,7 +338,7 @@ class TestCCXTBroker(unittest.TestCase):
             )
 
             self.assertIsNotNone(broker.exchange)
-            mock_exchange.set_sandbox_mode.assert_called_once_with(True)
+            self.assertEqual(mock_exchange.sandbox_mode_calls, [True])
 
     def test_init_broker_passes_selected_binance_env(self):
         """Test that ExecuteTradePlan passes the selected environment to CCXTBroker."""
@@ -359,20 +380,6 @@ class TestCCXTBroker(unittest.TestCase):
                 api_env="testnet",
             )
 
-    def test_trade_plan_format_requires_usdc(self):
-        """
-        Test documenting that trade plan format requires USDC as quote currency.
-        
-        The trade_plan.csv format uses the 'value_usdc' column and the executor
-        always places orders on USDC pairs.
-        """
-        # This is a documentation test - it passes to document the limitation
-        # Current trade_plan.csv format:
-        # action,currency,amount,value_usdc
-        # SELL,BTC,0.005,250.00
-        # 
-        self.assertTrue(True, "Trade plan format currently requires USDC quote currency")
-
 
 if __name__ == '__main__':
     unittest.main()
@@ -2,7 +2,6 @@
 """
 Tester för FtpUpload-modulen.
 """
-import shutil
 import tempfile
 import unittest
 from pathlib import Path
@@ -13,7 +12,7 @@ import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.config import Config
-from src.ftp_upload import FtpUpload, upload_file_to_ftp
+from src.ftp_upload import FtpUpload, _compile_pattern, upload_file_to_ftp
 
 
 def _make_cfg(data_root: str, **overrides) -> Config:
@@ -45,6 +44,10 @@ def _make_cfg(data_root: str, **overrides) -> Config:
     return Config(**defaults)
 
 
+# Valideringstesterna når aldrig filsystemet, så ingen katalog skapas för dem
+_UNUSED_DATA_ROOT = "/nonexistent/cryptohunk-data"
+
+
 def _create_html_files(data_root: Path) -> list:
     """Skapa testfiler under data_root för att simulera genererade HTML-filer."""
     viz_dir = data_root / "visualize"
@@ -63,12 +66,9 @@ def _create_html_files(data_root: Path) -> list:
 class TestFtpUploadFindFiles(unittest.TestCase):
 
     def setUp(self):
-        self.test_dir = tempfile.mkdtemp()
+        self.test_dir = self.enterContext(tempfile.TemporaryDirectory())
         self.data_root = Path(self.test_dir)
 
-    def tearDown(self):
-        shutil.rmtree(self.test_dir, ignore_errors=True)
-
     def test_find_html_files_matching_pattern(self):
         _create_html_files(self.data_root)
         cfg = _make_cfg(self.test_dir)
@@ -95,6 +95,39 @@ class TestFtpUploadFindFiles(unittest.TestCase):
         self.assertEqual(len(files), 1)
         self.assertEqual(files[0].name, "BTC_chart.html")
 
+    def test_find_html_files_reuses_compiled_pattern(self):
+        _create_html_files(self.data_root)
+        uploader = FtpUpload(_make_cfg(self.test_dir))
+        pattern = r"ETH_chart\.html$"
+        uploader._find_html_files(pattern)
+        hits_before = _compile_pattern.cache_info().hits
+        files = uploader._find_html_files(pattern)
+        self.assertEqual([f.name for f in files], ["ETH_chart.html"])
+        self.assertEqual(_compile_pattern.cache_info().hits, hits_before + 1)
+
+    def test_find_html_files_nested_dirs_sorted(self):
+        nested = self.data_root / "visualize" / "archive"
+        nested.mkdir(parents=True)
+        (nested / "ADA_chart.html").write_text("<html></html>", encoding="utf-8")
+        (nested / "ADA_chart.csv").write_text("x", encoding="utf-8")
+        _create_html_files(self.data_root)
+        uploader = FtpUpload(_make_cfg(self.test_dir))
+        files = uploader._find_html_files(r".*_chart\.html$")
+        self.assertEqual(files, sorted(files))
+        self.assertEqual(
+            [f.relative_to(self.data_root).as_posix() for f in files],
+            [
+                "visualize/BTC_chart.html",
+                "visualize/ETH_chart.html",
+                "visualize/SOL_chart.html",
+                "visualize/archive/ADA_chart.html",
+            ],
+        )
+
+    def test_find_html_files_missing_root(self):
+        uploader = FtpUpload(_make_cfg(str(self.data_root / "missing")))
+        self.assertEqual(uploader._find_html_files(r".*\.html$"), [])
+
     def test_find_html_files_empty_dir(self):
         cfg = _make_cfg(self.test_dir)
         uploader = FtpUpload(cfg)
@@ -102,104 +135,124 @@ class TestFtpUploadFindFiles(unittest.TestCase):
         self.assertEqual(len(files), 0)
 
 
-class TestFtpUploadRun(unittest.TestCase):
-
-    def setUp(self):
-        self.test_dir = tempfile.mkdtemp()
-        self.data_root = Path(self.test_dir)
-
-    def tearDown(self):
-        shutil.rmtree(self.test_dir, ignore_errors=True)
-
+class TestFtpUploadValidation(unittest.TestCase):
     def test_run_raises_if_ftp_host_missing(self):
-        cfg = _make_cfg(self.test_dir, ftp_host=None)
+        cfg = _make_cfg(_UNUSED_DATA_ROOT, ftp_host=None)
         uploader = FtpUpload(cfg)
         with self.assertRaises(ValueError):
             uploader.run()
 
     def test_run_raises_if_ftp_username_missing(self):
-        cfg = _make_cfg(self.test_dir, ftp_username=None)
+        cfg = _make_cfg(_UNUSED_DATA_ROOT, ftp_username=None)
         uploader = FtpUpload(cfg)
         with self.assertRaises(ValueError):
             uploader.run()
 
     def test_run_raises_if_ftp_password_missing(self):
-        cfg = _make_cfg(self.test_dir, ftp_password=None)
+        cfg = _make_cfg(_UNUSED_DATA_ROOT, ftp_password=None)
         uploader = FtpUpload(cfg)
         with self.assertRaises(ValueError):
             uploader.run()
 
     def test_run_raises_if_ftp_html_regexp_missing(self):
-        cfg = _make_cfg(self.test_dir, ftp_html_regexp=None)
+        cfg = _make_cfg(_UNUSED_DATA_ROOT, ftp_html_regexp=None)
         uploader = FtpUpload(cfg)
         with self.assertRaises(ValueError):
             uploader.run()
 
+
+class TestFtpUploadRun(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        patcher = patch("src.ftp_upload.ftplib.FTP")
+        cls.mock_ftp_class = patcher.start()
+        cls.addClassCleanup(patcher.stop)
+
+    def setUp(self):
+        self.test_dir = self.enterContext(tempfile.TemporaryDirectory())
+        self.data_root = Path(self.test_dir)
+        self.mock_ftp_class.reset_mock()
+        self.mock_ftp = MagicMock()
+        self.mock_ftp_class.return_value = self.mock_ftp
+
     def test_run_returns_false_when_no_files_match(self):
         cfg = _make_cfg(self.test_dir, ftp_html_regexp=r"nonexistent")
         uploader = FtpUpload(cfg)
         result = uploader.run()
         self.assertFalse(result)
 
-    @patch("src.ftp_upload.ftplib.FTP")
-    def test_run_uploads_matching_files(self, mock_ftp_class):
+    def test_run_uploads_matching_files(self):
         _create_html_files(self.data_root)
         cfg = _make_cfg(self.test_dir)
 
-        mock_ftp = MagicMock()
-        mock_ftp_class.return_value = mock_ftp
-
         uploader = FtpUpload(cfg)
         result = uploader.run()
 
         self.assertTrue(result)
-        mock_ftp_class.assert_called_once_with("ftp.example.com")
-        mock_ftp.login.assert_called_once_with("testuser", "testpass")
-        mock_ftp.cwd.assert_called_once_with("/remote/dir")
-        self.assertEqual(mock_ftp.storbinary.call_count, 3)
-        mock_ftp.quit.assert_called_once()
+        self.mock_ftp_class.assert_called_once_with("ftp.example.com")
+        self.mock_ftp.login.assert_called_once_with("testuser", "testpass")
+        self.mock_ftp.cwd.assert_called_once_with("/remote/dir")
+        self.assertEqual(self.mock_ftp.transfercmd.call_count, 3)
+        self.assertEqual(self.mock_ftp.voidresp.call_count, 3)
+        self.mock_ftp.quit.assert_called_once()
+
+    def test_run_uploads_all_files_over_one_session(self):
+        _create_html_files(self.data_root)
+        cfg = _make_cfg(self.test_dir)
 
-    @patch("src.ftp_upload.ftplib.FTP")
-    def test_run_skips_cwd_when_ftp_dir_empty(self, mock_ftp_class):
+        uploader = FtpUpload(cfg)
+        uploader.run()
+
+        self.mock_ftp_class.assert_called_once()
+        self.mock_ftp.login.assert_called_once()
+        self.assertEqual(self.mock_ftp.transfercmd.call_count, 3)
+        self.mock_ftp.voidcmd.assert_called_once_with("TYPE I")
+
+    def test_run_streams_file_with_sendfile(self):
         _create_html_files(self.data_root)
-        cfg = _make_cfg(self.test_dir, ftp_dir=None)
+        cfg = _make_cfg(self.test_dir, ftp_html_regexp=r"BTC_chart\.html$")
 
-        mock_ftp = MagicMock()
-        mock_ftp_class.return_value = mock_ftp
+        conn = self.mock_ftp.transfercmd.return_value.__enter__.return_value
+        sent = []
+        conn.sendfile.side_effect = lambda f: sent.append(f.read())
+
+        uploader = FtpUpload(cfg)
+        self.assertTrue(uploader.run())
+
+        self.assertEqual(sent, [b"<html><body>BTC_chart.html</body></html>"])
+        self.mock_ftp.voidresp.assert_called_once()
+
+    def test_run_skips_cwd_when_ftp_dir_empty(self):
+        _create_html_files(self.data_root)
+        cfg = _make_cfg(self.test_dir, ftp_dir=None)
 
         uploader = FtpUpload(cfg)
         result = uploader.run()
 
         self.assertTrue(result)
-        mock_ftp.cwd.assert_not_called()
+        self.mock_ftp.cwd.assert_not_called()
 
-    @patch("src.ftp_upload.ftplib.FTP")
-    def test_run_uploads_correct_filenames(self, mock_ftp_class):
+    def test_run_uploads_correct_filenames(self):
         _create_html_files(self.data_root)
         cfg = _make_cfg(self.test_dir, ftp_html_regexp=r"BTC_chart\.html$")
 
-        mock_ftp = MagicMock()
-        mock_ftp_class.return_value = mock_ftp
-
         uploader = FtpUpload(cfg)
         result = uploader.run()
 
         self.assertTrue(result)
-        self.assertEqual(mock_ftp.storbinary.call_count, 1)
-        stor_call = mock_ftp.storbinary.call_args
+        self.assertEqual(self.mock_ftp.transfercmd.call_count, 1)
+        stor_call = self.mock_ftp.transfercmd.call_args
         self.assertIn("STOR BTC_chart.html", stor_call[0][0])
 
 
 class TestUploadFileToFtp(unittest.TestCase):
 
     def setUp(self):
-        self.test_dir = tempfile.mkdtemp()
+        self.test_dir = self.enterContext(tempfile.TemporaryDirectory())
         self.filepath = Path(self.test_dir) / "test.log"
         self.filepath.write_text("Hellow world\n", encoding="utf-8")
 
-    def tearDown(self):
-        shutil.rmtree(self.test_dir, ignore_errors=True)
-
     @patch("src.ftp_upload.ftplib.FTP")
     def test_upload_file_to_ftp_uploads_file(self, mock_ftp_class):
         mock_ftp = MagicMock()
@@ -217,8 +270,8 @@ class TestUploadFileToFtp(unittest.TestCase):
         mock_ftp_class.assert_called_once_with("ftp.example.com")
         mock_ftp.login.assert_called_once_with("testuser", "testpass")
         mock_ftp.cwd.assert_called_once_with("/remote/dir")
-        mock_ftp.storbinary.assert_called_once()
-        self.assertIn("STOR test.log", mock_ftp.storbinary.call_args[0][0])
+        mock_ftp.transfercmd.assert_called_once()
+        self.assertIn("STOR test.log", mock_ftp.transfercmd.call_args[0][0])
         mock_ftp.quit.assert_called_once()
 
     def test_upload_file_to_ftp_raises_if_file_missing(self):
@@ -10,8 +10,8 @@ Covers:
 """
 import unittest
 import tempfile
-import shutil
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import sys
 
@@ -22,6 +22,10 @@ from src.rebalance_portfolio import RebalancePortfolio
 from src.config import Config
 
 
+# Signal tests never read or write files, so no per-test temp directory is created
+_UNUSED_DATA_ROOT = tempfile.gettempdir()
+
+
 def _make_cfg(tmp_dir, ta2_use_ema50_filter=False):
     return Config(
         currencies=["BTC"],
@@ -50,6 +54,9 @@ def _make_cfg(tmp_dir, ta2_use_ema50_filter=False):
     )
 
 
+_TA_COLUMNS = ["Close", "EMA_200", "EMA_21", "EMA_50", "MACD", "MACD_Signal"]
+
+
 def _build_ta_df(
     n_rows=20,
     close=55000.0,
@@ -63,33 +70,22 @@ def _build_ta_df(
     macd_signal_prev=5.0,    # MACD_Signal at t-1
 ):
     """Build a minimal DataFrame that satisfies (or can be tweaked to fail) TA2 entry/exit rules."""
-    rows = n_rows
-
-    data = {
-        "Close": [close] * rows,
-        "EMA_200": [ema_200] * rows,
-        "EMA_21": [ema_21] * rows,
-        "EMA_50": [ema_50] * rows,
-        "MACD": [macd] * rows,
-        "MACD_Signal": [macd_signal] * rows,
-    }
-    df = pd.DataFrame(data)
-    # Set previous candle MACD values for cross detection
-    df.loc[df.index[-2], "MACD"] = macd_prev
-    df.loc[df.index[-2], "MACD_Signal"] = macd_signal_prev
-    return df
+    # One float64 block for all columns; previous candle MACD values set for cross detection
+    block = np.empty((n_rows, len(_TA_COLUMNS)), dtype=np.float64)
+    block[:] = (close, ema_200, ema_21, ema_50, macd, macd_signal)
+    block[-2, 4] = macd_prev
+    block[-2, 5] = macd_signal_prev
+    return pd.DataFrame(block, columns=_TA_COLUMNS)
 
 
 class TestTA2SignalEntry(unittest.TestCase):
     """Test TA2 entry (BUY) signal detection."""
 
-    def setUp(self):
-        self.tmp = tempfile.mkdtemp()
-        self.cfg = _make_cfg(self.tmp)
-        self.rebalancer = RebalancePortfolio(self.cfg)
-
-    def tearDown(self):
-        shutil.rmtree(self.tmp, ignore_errors=True)
+    @classmethod
+    def setUpClass(cls):
+        # The signal methods only read cfg, so one instance serves the whole class
+        cls.cfg = _make_cfg(_UNUSED_DATA_ROOT)
+        cls.rebalancer = RebalancePortfolio(cls.cfg)
 
     def test_buy_signal_when_all_conditions_met(self):
         df = _build_ta_df()
@@ -160,13 +156,10 @@ class TestTA2SignalEntry(unittest.TestCase):
 class TestTA2SignalExit(unittest.TestCase):
     """Test TA2 exit (SELL) signal detection."""
 
-    def setUp(self):
-        self.tmp = tempfile.mkdtemp()
-        self.cfg = _make_cfg(self.tmp)
-        self.rebalancer = RebalancePortfolio(self.cfg)
-
-    def tearDown(self):
-        shutil.rmtree(self.tmp, ignore_errors=True)
+    @classmethod
+    def setUpClass(cls):
+        cls.cfg = _make_cfg(_UNUSED_DATA_ROOT)
+        cls.rebalancer = RebalancePortfolio(cls.cfg)
 
     def test_sell_when_macd_below_signal(self):
         df = _build_ta_df(macd=3.0, macd_signal=5.0)
@@ -186,15 +179,9 @@ class TestTA2SignalExit(unittest.TestCase):
 class TestTA2EMA50Filter(unittest.TestCase):
     """Test optional EMA50 trend-strength filter for TA2."""
 
-    def setUp(self):
-        self.tmp = tempfile.mkdtemp()
-
-    def tearDown(self):
-        shutil.rmtree(self.tmp, ignore_errors=True)
-
     def test_ema50_filter_disabled_by_default(self):
         """When filter off, EMA50 <= EMA200 should not block BUY."""
-        cfg = _make_cfg(self.tmp, ta2_use_ema50_filter=False)
+        cfg = _make_cfg(_UNUSED_DATA_ROOT, ta2_use_ema50_filter=False)
         rebalancer = RebalancePortfolio(cfg)
         # EMA_50 < EMA_200 but filter disabled
         df = _build_ta_df(ema_50=48000.0, ema_200=50000.0)
@@ -203,7 +190,7 @@ class TestTA2EMA50Filter(unittest.TestCase):
 
     def test_ema50_filter_blocks_buy_when_ema50_below_ema200(self):
         """When filter on, EMA50 <= EMA200 should block BUY → HOLD."""
-        cfg = _make_cfg(self.tmp, ta2_use_ema50_filter=True)
+        cfg = _make_cfg(_UNUSED_DATA_ROOT, ta2_use_ema50_filter=True)
         rebalancer = RebalancePortfolio(cfg)
         df = _build_ta_df(ema_50=48000.0, ema_200=50000.0)
         result = rebalancer._calculate_ta2_signal(df)
@@ -211,7 +198,7 @@ class TestTA2EMA50Filter(unittest.TestCase):
 
     def test_ema50_filter_allows_buy_when_ema50_above_ema200(self):
         """When filter on and EMA50 > EMA200, BUY is allowed."""
-        cfg = _make_cfg(self.tmp, ta2_use_ema50_filter=True)
+        cfg = _make_cfg(_UNUSED_DATA_ROOT, ta2_use_ema50_filter=True)
         rebalancer = RebalancePortfolio(cfg)
         df = _build_ta_df(ema_50=52000.0, ema_200=50000.0)
         result = rebalancer._calculate_ta2_signal(df)
@@ -221,13 +208,10 @@ class TestTA2EMA50Filter(unittest.TestCase):
 class TestTA2OverrideRules(unittest.TestCase):
     """Test that take profit / stop loss overrides apply even when TA2 says HOLD/BUY/SELL."""
 
-    def setUp(self):
-        self.tmp = tempfile.mkdtemp()
-        self.cfg = _make_cfg(self.tmp)
-        self.rebalancer = RebalancePortfolio(self.cfg)
-
-    def tearDown(self):
-        shutil.rmtree(self.tmp, ignore_errors=True)
+    @classmethod
+    def setUpClass(cls):
+        cls.cfg = _make_cfg(_UNUSED_DATA_ROOT)
+        cls.rebalancer = RebalancePortfolio(cls.cfg)
 
     def test_take_profit_does_not_sell_below_threshold(self):
         """Rule 3: holdings < threshold → no SELL even when profit exceeds take_profit_pct."""
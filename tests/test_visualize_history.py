@@ -2,8 +2,9 @@
 """
 Tester för VisualizeHistory-modulen.
 """
+import csv
+import functools
 import json
-import shutil
 import tempfile
 import unittest
 from pathlib import Path
@@ -15,7 +16,7 @@ import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.config import Config
-from src.visualize_history import VisualizeHistory
+from src.visualize_history import TRADE_CUSTOMDATA_COLUMNS, VisualizeHistory
 
 
 def _make_cfg(data_root: str) -> Config:
@@ -45,34 +46,47 @@ def _make_cfg(data_root: str) -> Config:
     )
 
 
+_HISTORY_CSV_HEADER = (
+    "Open_Time_ms,Open,High,Low,Close,Volume,Close_Time_ms,Quote_Asset_Volume,"
+    "Number_of_Trades,Taker_Buy_Base_Asset_Volume,Taker_Buy_Quote_Asset_Volume"
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _history_csv_bytes(n: int, base_ms: int) -> bytes:
+    """Bygg CSV-innehållet för en kurshistorik en gång per (n, base_ms)."""
+    interval_ms = 3_600_000
+    lines = [_HISTORY_CSV_HEADER]
+    for i in range(n):
+        p = 40000 + i * 10
+        open_ms = base_ms + i * interval_ms
+        lines.append(
+            f"{open_ms},{p},{p * 1.005!r},{p * 0.995!r},{p},100.0,"
+            f"{open_ms + interval_ms - 1},4000000.0,1000,50.0,2000000.0"
+        )
+    lines.append("")
+    return "\n".join(lines).encode("utf-8")
+
+
 def _create_history_csv(history_dir: Path, currency: str, n: int = 50, base_ms: Optional[int] = None) -> None:
     """Skapa en minimal kurshistorikfil för testning."""
     if base_ms is None:
         base_ms = 1_700_000_000_000  # 2023-11-14T22:13:20Z ungefär
-    interval_ms = 3_600_000
-    prices = [40000 + i * 10 for i in range(n)]
-    data = {
-        "Open_Time_ms": [base_ms + i * interval_ms for i in range(n)],
-        "Open": prices,
-        "High": [p * 1.005 for p in prices],
-        "Low": [p * 0.995 for p in prices],
-        "Close": prices,
-        "Volume": [100.0] * n,
-        "Close_Time_ms": [base_ms + i * interval_ms + interval_ms - 1 for i in range(n)],
-        "Quote_Asset_Volume": [4_000_000.0] * n,
-        "Number_of_Trades": [1000] * n,
-        "Taker_Buy_Base_Asset_Volume": [50.0] * n,
-        "Taker_Buy_Quote_Asset_Volume": [2_000_000.0] * n,
-    }
-    df = pd.DataFrame(data)
     history_dir.mkdir(parents=True, exist_ok=True)
-    df.to_csv(history_dir / f"{currency}_history.csv", index=False)
+    (history_dir / f"{currency}_history.csv").write_bytes(_history_csv_bytes(n, base_ms))
+
+
+@functools.cache
+def _plain_btc_chart() -> Optional[str]:
+    """BTC-diagram (50 candles, inga trades eller backtest) som genereras en gång per process."""
+    with tempfile.TemporaryDirectory() as tmp:
+        _create_history_csv(Path(tmp) / "history", "BTC", n=50)
+        return VisualizeHistory(_make_cfg(tmp)).generate_chart("BTC", [])
 
 
 def _create_trades_json(trades_dir: Path, trades: list) -> None:
     trades_dir.mkdir(parents=True, exist_ok=True)
-    with open(trades_dir / "trades.json", "w", encoding="utf-8") as f:
-        json.dump(trades, f)
+    (trades_dir / "trades.json").write_bytes(json.dumps(trades).encode("utf-8"))
 
 
 def _create_portfolio_json(data_root: Path, balances: dict) -> None:
@@ -80,27 +94,26 @@ def _create_portfolio_json(data_root: Path, balances: dict) -> None:
     portfolio_dir = data_root / "portfolio"
     portfolio_dir.mkdir(parents=True, exist_ok=True)
     payload = {"balances": {k: {"total": str(v)} for k, v in balances.items()}}
-    with open(portfolio_dir / "portfolio.json", "w", encoding="utf-8") as f:
-        json.dump(payload, f)
+    (portfolio_dir / "portfolio.json").write_bytes(json.dumps(payload).encode("utf-8"))
 
 
 def _create_recommendations_csv(data_root: Path, rows: list) -> None:
     """Create a minimal rebalance recommendations.csv for overview tests."""
     output_dir = data_root / "output" / "rebalance"
     output_dir.mkdir(parents=True, exist_ok=True)
-    pd.DataFrame(rows).to_csv(output_dir / "recommendations.csv", index=False)
+    with open(output_dir / "recommendations.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]), lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
 
 
 class TestVisualizeHistory(unittest.TestCase):
 
     def setUp(self):
-        self.test_dir = tempfile.mkdtemp()
+        self.test_dir = self.enterContext(tempfile.TemporaryDirectory())
         self.data_root = Path(self.test_dir)
         self.cfg = _make_cfg(self.test_dir)
 
-    def tearDown(self):
-        shutil.rmtree(self.test_dir, ignore_errors=True)
-
     # ------------------------------------------------------------------
     # _read_history
     # ------------------------------------------------------------------
@@ -139,26 +152,43 @@ class TestVisualizeHistory(unittest.TestCase):
         self.assertEqual(result, [])
 
     # ------------------------------------------------------------------
-    # _filter_trades_for_currency
+    # _group_trades_by_currency
     # ------------------------------------------------------------------
 
-    def test_filter_trades_for_currency(self):
+    def test_group_trades_by_currency(self):
         trades = [
             {"symbol": "BTCUSDC", "isBuyer": True, "time": 1_700_000_000_000},
             {"symbol": "ETHUSDC", "isBuyer": False, "time": 1_700_000_000_000},
             {"symbol": "BTCUSDC", "isBuyer": False, "time": 1_700_000_000_000},
+            {"symbol": "SOLUSDC", "isBuyer": True, "time": 1_700_000_000_000},
         ]
         viz = VisualizeHistory(self.cfg)
-        result = viz._filter_trades_for_currency(trades, "BTC")
-        self.assertEqual(len(result), 2)
-        for t in result:
+        result = viz._group_trades_by_currency(trades, ["BTC", "ETH", "BNB"])
+        self.assertEqual(set(result), {"BTC", "ETH", "BNB"})
+        self.assertEqual(len(result["BTC"]), 2)
+        for t in result["BTC"]:
             self.assertTrue(t["symbol"].startswith("BTC"))
+        self.assertEqual(len(result["ETH"]), 1)
+        self.assertEqual(result["BNB"], [])
+
+    def test_group_trades_by_currency_prefers_longest_prefix(self):
+        trades = [
+            {"symbol": "ETHUSDC", "isBuyer": True, "time": 1_700_000_000_000},
+            {"symbol": "ETHFIUSDC", "isBuyer": True, "time": 1_700_000_000_000},
+        ]
+        viz = VisualizeHistory(self.cfg)
+        result = viz._group_trades_by_currency(trades, ["ETH", "ETHFI"])
+        self.assertEqual([t["symbol"] for t in result["ETH"]], ["ETHUSDC"])
+        self.assertEqual([t["symbol"] for t in result["ETHFI"]], ["ETHFIUSDC"])
 
     # ------------------------------------------------------------------
-    # _format_trade_label
+    # _trade_markers
     # ------------------------------------------------------------------
 
-    def test_format_trade_label_buy(self):
+    # 2023-11-14T00:00Z .. 2023-11-16T00:00Z i epoch-ms
+    _WINDOW = (1_699_920_000_000, 1_700_092_800_000)
+
+    def test_trade_markers_buy(self):
         trade = {
             "id": 42, "orderId": 99, "symbol": "BTCUSDC", "isBuyer": True,
             "price": "41000.00", "qty": "0.001", "quoteQty": "41.00",
@@ -166,15 +196,21 @@ class TestVisualizeHistory(unittest.TestCase):
             "time": 1_700_003_600_000,
         }
         viz = VisualizeHistory(self.cfg)
-        label = viz._format_trade_label(trade)
-        self.assertIn("KÖP", label)
-        self.assertIn("BTCUSDC", label)
-        self.assertIn("41000.00", label)
+        markers = viz._trade_markers([trade], *self._WINDOW)
+        self.assertEqual(len(markers), 1)
+        row = markers.iloc[0]
+        self.assertTrue(row["is_buy"])
+        self.assertEqual(row["y"], 41000.0)
+        self.assertEqual(row["x"], "2023-11-14T23:13:20")
+        fields = list(markers[TRADE_CUSTOMDATA_COLUMNS].iloc[0])
+        self.assertEqual(fields[:3], ["KÖP", "BTCUSDC", "41000.00"])
+        self.assertEqual(fields[7], "2023-11-14 23:13:20 UTC")
+        self.assertEqual(fields[8], "")
         # Trade-ID and Order-ID should NOT appear in the popup
-        self.assertNotIn("Trade-ID", label)
-        self.assertNotIn("Order-ID", label)
+        self.assertNotIn("42", fields)
+        self.assertNotIn("99", fields)
 
-    def test_format_trade_label_sell(self):
+    def test_trade_markers_sell(self):
         trade = {
             "id": 43, "orderId": 100, "symbol": "BTCUSDC", "isBuyer": False,
             "price": "42000.00", "qty": "0.001", "quoteQty": "42.00",
@@ -182,40 +218,86 @@ class TestVisualizeHistory(unittest.TestCase):
             "time": 1_700_007_200_000,
         }
         viz = VisualizeHistory(self.cfg)
-        label = viz._format_trade_label(trade)
-        self.assertIn("SÄLJ", label)
-        self.assertIn("42000.00", label)
+        markers = viz._trade_markers([trade], *self._WINDOW)
+        fields = list(markers[TRADE_CUSTOMDATA_COLUMNS].iloc[0])
+        self.assertEqual(fields[0], "SÄLJ")
+        self.assertEqual(fields[2], "42000.00")
+        self.assertEqual(fields[5:7], ["0.042", "USDC"])
         # Trade-ID and Order-ID should NOT appear in the popup
-        self.assertNotIn("Trade-ID", label)
-        self.assertNotIn("Order-ID", label)
-        # Without buy_price, no percentage change should appear
-        self.assertNotIn("Förändring", label)
+        self.assertNotIn("43", fields)
+        self.assertNotIn("100", fields)
+        # Without a preceding buy, no percentage change should appear
+        self.assertEqual(fields[8], "")
 
-    def test_format_trade_label_sell_with_buy_price_profit(self):
-        trade = {
-            "id": 43, "orderId": 100, "symbol": "BTCUSDC", "isBuyer": False,
-            "price": "42000.00", "qty": "0.001", "quoteQty": "42.00",
-            "commission": "0.042", "commissionAsset": "USDC",
-            "time": 1_700_007_200_000,
-        }
+    def _buy_then_sell(self, sell_price: str) -> list:
+        return [
+            {
+                "symbol": "BTCUSDC", "isBuyer": False, "price": sell_price,
+                "qty": "0.001", "quoteQty": "42.00", "commission": "0.042",
+                "commissionAsset": "USDC", "time": 1_700_007_200_000,
+            },
+            {
+                "symbol": "BTCUSDC", "isBuyer": True, "price": "40000.00",
+                "qty": "0.001", "quoteQty": "40.00", "commission": "0.000001",
+                "commissionAsset": "BTC", "time": 1_700_003_600_000,
+            },
+        ]
+
+    def test_trade_markers_sell_with_buy_price_profit(self):
         viz = VisualizeHistory(self.cfg)
-        label = viz._format_trade_label(trade, buy_price=40000.0)
-        self.assertIn("SÄLJ", label)
-        self.assertIn("Förändring vs. köp", label)
-        self.assertIn("+5.00%", label)
+        markers = viz._trade_markers(self._buy_then_sell("42000.00"), *self._WINDOW)
+        # Sorted on time: buy first, then sell
+        self.assertEqual(list(markers["action"]), ["KÖP", "SÄLJ"])
+        self.assertEqual(markers["change_str"].iloc[1], "<br>Förändring vs. köp: +5.00%")
 
-    def test_format_trade_label_sell_with_buy_price_loss(self):
-        trade = {
-            "id": 43, "orderId": 100, "symbol": "BTCUSDC", "isBuyer": False,
-            "price": "38000.00", "qty": "0.001", "quoteQty": "38.00",
-            "commission": "0.038", "commissionAsset": "USDC",
-            "time": 1_700_007_200_000,
-        }
+    def test_trade_markers_sell_with_buy_price_loss(self):
+        viz = VisualizeHistory(self.cfg)
+        markers = viz._trade_markers(self._buy_then_sell("38000.00"), *self._WINDOW)
+        self.assertEqual(markers["change_str"].iloc[1], "<br>Förändring vs. köp: -5.00%")
+
+    def test_trade_markers_skips_invalid_and_out_of_window(self):
+        trades = [
+            {"symbol": "BTCUSDC", "isBuyer": True, "price": "40000", "time": None},
+            {"symbol": "BTCUSDC", "isBuyer": True, "price": "abc", "time": 1_700_003_600_000},
+            {"symbol": "BTCUSDC", "isBuyer": True, "price": None, "time": 1_700_003_600_000},
+            {"symbol": "BTCUSDC", "isBuyer": True, "price": "40000", "time": 1_600_000_000_000},
+            {"symbol": "BTCUSDC", "price": "40000", "time": 1_700_003_600_000},
+        ]
+        viz = VisualizeHistory(self.cfg)
+        markers = viz._trade_markers(trades, *self._WINDOW)
+        self.assertEqual(len(markers), 1)
+        # Missing isBuyer counts as a sell, missing fields show "?"
+        self.assertEqual(markers["action"].iloc[0], "SÄLJ")
+        self.assertEqual(markers["qty"].iloc[0], "?")
+
+    def test_trade_markers_missing_price_is_plotted_at_zero(self):
+        trades = [
+            {"symbol": "BTCUSDC", "isBuyer": True, "price": "40000", "time": 1_700_000_000_000},
+            {"symbol": "BTCUSDC", "isBuyer": False, "qty": "0.001", "commission": None,
+             "time": 1_700_003_600_000},
+        ]
         viz = VisualizeHistory(self.cfg)
-        label = viz._format_trade_label(trade, buy_price=40000.0)
-        self.assertIn("SÄLJ", label)
-        self.assertIn("Förändring vs. köp", label)
-        self.assertIn("-5.00%", label)
+        markers = viz._trade_markers(trades, *self._WINDOW)
+        self.assertEqual(len(markers), 2)
+        sell = markers.iloc[1]
+        self.assertEqual(sell["y"], 0.0)
+        self.assertEqual(sell["price"], "?")
+        # None is shown via str(), not as "?"
+        self.assertEqual(sell["commission"], "None")
+        # Without a price, no change vs. the buy is computed
+        self.assertEqual(sell["change_str"], "")
+
+    def test_trade_markers_window_bounds_are_inclusive(self):
+        start_ms, end_ms = self._WINDOW
+        trades = [
+            {"symbol": "BTCUSDC", "isBuyer": True, "price": "1", "time": start_ms - 1},
+            {"symbol": "BTCUSDC", "isBuyer": True, "price": "2", "time": start_ms},
+            {"symbol": "BTCUSDC", "isBuyer": True, "price": "3", "time": end_ms},
+            {"symbol": "BTCUSDC", "isBuyer": True, "price": "4", "time": end_ms + 1},
+        ]
+        viz = VisualizeHistory(self.cfg)
+        markers = viz._trade_markers(trades, start_ms, end_ms)
+        self.assertEqual(list(markers["price"]), ["2", "3"])
 
     # ------------------------------------------------------------------
     # generate_chart
@@ -243,7 +325,7 @@ class TestVisualizeHistory(unittest.TestCase):
         html_content = viz.generate_chart("BTC", trades)
         self.assertIsNotNone(html_content)
 
-        self.assertIn("plotly", html_content.lower())
+        self.assertIn("plotly", html_content)
         # Trade data encoding differs between Plotly versions; check stable content.
         self.assertIn("BTCUSDC", html_content)
         self.assertTrue('"name":"K\\u00f6p"' in html_content or '"name":"Köp"' in html_content)
@@ -279,19 +361,31 @@ class TestVisualizeHistory(unittest.TestCase):
         self.assertIn("+5.00%", html_content)
 
     def test_generate_chart_without_trades(self):
+        html_content = _plain_btc_chart()
+        self.assertIsNotNone(html_content)
+        self.assertIn("plotly", html_content)
+
+    def test_generate_chart_x_axis_uses_iso_strings(self):
+        """Candle and trade x-values are pre-formatted ISO strings (UTC wall time)."""
         hist_dir = self.data_root / "history"
         _create_history_csv(hist_dir, "BTC", n=50)
+        trades = [
+            {
+                "id": 1, "orderId": 10, "symbol": "BTCUSDC", "isBuyer": True,
+                "price": "40100.00", "qty": "0.001", "quoteQty": "40.10",
+                "commission": "0.000001", "commissionAsset": "BTC",
+                "time": 1_700_003_600_000,
+            },
+        ]
         viz = VisualizeHistory(self.cfg)
-        html_content = viz.generate_chart("BTC", [])
+        html_content = viz.generate_chart("BTC", trades)
         self.assertIsNotNone(html_content)
-        self.assertIn("plotly", html_content.lower())
+        self.assertIn('"2023-11-14T22:13:20"', html_content)
+        self.assertIn('"x":["2023-11-14T23:13:20"]', html_content)
 
     def test_generate_chart_has_rangeselector_buttons(self):
         """Verify time-range selector buttons are present in the generated HTML."""
-        hist_dir = self.data_root / "history"
-        _create_history_csv(hist_dir, "BTC", n=50)
-        viz = VisualizeHistory(self.cfg)
-        html_content = viz.generate_chart("BTC", [])
+        html_content = _plain_btc_chart()
         self.assertIsNotNone(html_content)
         # Expected buttons (encoding differs between Plotly versions)
         self.assertIn('"label":"Senaste veckan"', html_content)
@@ -302,7 +396,7 @@ class TestVisualizeHistory(unittest.TestCase):
         self.assertIn('"label":"Allt"', html_content)
         # "3 månader" button must be absent
         self.assertNotIn('"label":"3', html_content)
-        self.assertIn("rangeselector", html_content.lower())
+        self.assertIn("rangeselector", html_content)
 
     def test_generate_chart_missing_history_returns_none(self):
         viz = VisualizeHistory(self.cfg)
@@ -320,7 +414,6 @@ class TestVisualizeHistory(unittest.TestCase):
         records: list,
     ) -> None:
         """Create a minimal backtesting CSV file for testing."""
-        import csv
         backtest_dir.mkdir(parents=True, exist_ok=True)
         fieldnames = ["timestamp_ms", "currency", "ta_signal", "signal"]
         with open(backtest_dir / f"{currency}_backtesting.csv", "w", newline="", encoding="utf-8") as f:
@@ -441,10 +534,7 @@ class TestVisualizeHistory(unittest.TestCase):
 
     def test_generate_chart_no_backtest_no_vrect(self):
         """generate_chart should not crash and produce no colored vrects when backtest file is absent."""
-        hist_dir = self.data_root / "history"
-        _create_history_csv(hist_dir, "BTC", n=50)
-        viz = VisualizeHistory(self.cfg)
-        html_content = viz.generate_chart("BTC", [])
+        html_content = _plain_btc_chart()
         self.assertIsNotNone(html_content)
         self.assertNotIn("rgba(0, 138, 52, 0.20)", html_content)
         self.assertNotIn("rgba(138, 0, 0, 0.20)", html_content)
@@ -578,7 +668,7 @@ class TestVisualizeHistory(unittest.TestCase):
         ]
         html_content = viz.generate_portfolio_chart(trades, dfs)
         self.assertIsNotNone(html_content)
-        self.assertIn("plotly", html_content.lower())
+        self.assertIn("plotly", html_content)
         self.assertIn("chart-Performance", html_content)
 
     def test_generate_portfolio_chart_has_rangeselector(self):
@@ -595,7 +685,7 @@ class TestVisualizeHistory(unittest.TestCase):
         ]
         html_content = viz.generate_portfolio_chart(trades, dfs)
         self.assertIsNotNone(html_content)
-        self.assertIn("rangeselector", html_content.lower())
+        self.assertIn("rangeselector", html_content)
         self.assertIn('"label":"Senaste veckan"', html_content)
         self.assertIn('"label":"Allt"', html_content)
 
@@ -649,6 +739,123 @@ class TestVisualizeHistory(unittest.TestCase):
         self.assertIn("BTC", content)
         self.assertNotIn("trade-info", content)
 
+    def test_run_reads_each_history_file_once(self):
+        from unittest.mock import patch
+
+        hist_dir = self.data_root / "history"
+        _create_history_csv(hist_dir, "BTC", n=50)
+        viz = VisualizeHistory(self.cfg)
+        with patch.object(viz, "_read_history", wraps=viz._read_history) as mock_read:
+            self.assertTrue(viz.run())
+        mock_read.assert_called_once_with("BTC")
+
+    def test_run_writes_gzip_copy_when_enabled(self):
+        import dataclasses
+        import gzip
+
+        hist_dir = self.data_root / "history"
+        _create_history_csv(hist_dir, "BTC", n=50)
+        cfg = dataclasses.replace(self.cfg, compress_visualize=True)
+        self.assertTrue(VisualizeHistory(cfg).run())
+        html_file = self.data_root / "visualize" / "history_chart.html"
+        gz_file = self.data_root / "visualize" / "history_chart.html.gz"
+        self.assertTrue(gz_file.exists())
+        with gzip.open(gz_file, "rt", encoding="utf-8") as gz:
+            self.assertEqual(gz.read(), html_file.read_text(encoding="utf-8"))
+
+        # Utan flaggan tas den inaktuella gz-kopian bort
+        self.assertTrue(VisualizeHistory(self.cfg).run())
+        self.assertFalse(gz_file.exists())
+
+    def test_run_skips_rebuild_when_inputs_unchanged(self):
+        import dataclasses
+        from unittest.mock import patch
+
+        hist_dir = self.data_root / "history"
+        _create_history_csv(hist_dir, "BTC", n=50)
+        self.assertTrue(VisualizeHistory(self.cfg).run())
+        self.assertTrue((self.data_root / "visualize" / "history_chart.manifest.json").exists())
+
+        with patch.object(
+            VisualizeHistory, "generate_chart", return_value="<div></div>"
+        ) as mock_chart:
+            self.assertTrue(VisualizeHistory(self.cfg).run())
+            mock_chart.assert_not_called()
+
+            # VISUALIZE_FORCE_REGEN bygger om trots oförändrade indata
+            forced = dataclasses.replace(self.cfg, visualize_force_regen=True)
+            self.assertTrue(VisualizeHistory(forced).run())
+            mock_chart.assert_called_once()
+
+    def test_run_rebuilds_when_input_changes(self):
+        from unittest.mock import patch
+
+        hist_dir = self.data_root / "history"
+        _create_history_csv(hist_dir, "BTC", n=50)
+        self.assertTrue(VisualizeHistory(self.cfg).run())
+
+        _create_trades_json(self.data_root / "trades", [])
+        with patch.object(
+            VisualizeHistory, "generate_chart", return_value="<div></div>"
+        ) as mock_chart:
+            self.assertTrue(VisualizeHistory(self.cfg).run())
+            mock_chart.assert_called_once()
+
+    def test_run_skips_manifest_when_a_section_fails(self):
+        from unittest.mock import patch
+
+        hist_dir = self.data_root / "history"
+        _create_history_csv(hist_dir, "BTC", n=50)
+        manifest_file = self.data_root / "visualize" / "history_chart.manifest.json"
+
+        with patch.object(
+            VisualizeHistory, "generate_summary_html", side_effect=RuntimeError("boom")
+        ):
+            self.assertTrue(VisualizeHistory(self.cfg).run())
+        self.assertFalse(manifest_file.exists())
+
+        # Nästa körning med samma indata bygger om och skriver manifestet
+        with patch.object(
+            VisualizeHistory, "generate_chart", wraps=VisualizeHistory(self.cfg).generate_chart
+        ) as mock_chart:
+            self.assertTrue(VisualizeHistory(self.cfg).run())
+            mock_chart.assert_called_once()
+        self.assertTrue(manifest_file.exists())
+
+    def test_run_rebuilds_when_manifest_version_changes(self):
+        from unittest.mock import patch
+        from src import visualize_history
+
+        hist_dir = self.data_root / "history"
+        _create_history_csv(hist_dir, "BTC", n=50)
+        self.assertTrue(VisualizeHistory(self.cfg).run())
+        manifest = json.loads(
+            (self.data_root / "visualize" / "history_chart.manifest.json").read_text(encoding="utf-8")
+        )
+        self.assertEqual(manifest["plotly_version"], visualize_history.plotly.__version__)
+
+        with patch.object(
+            visualize_history, "_MANIFEST_VERSION", visualize_history._MANIFEST_VERSION + 1
+        ), patch.object(
+            VisualizeHistory, "generate_chart", return_value="<div></div>"
+        ) as mock_chart:
+            self.assertTrue(VisualizeHistory(self.cfg).run())
+            mock_chart.assert_called_once()
+
+    def test_run_refreshes_debug_csv_when_skipping_rebuild(self):
+        from unittest.mock import patch
+
+        hist_dir = self.data_root / "history"
+        _create_history_csv(hist_dir, "BTC", n=50, base_ms=self._recent_base_ms(50))
+        self.assertTrue(VisualizeHistory(self.cfg).run())
+        debug_file = self.data_root / "visualize" / "debug.csv"
+        debug_file.unlink()
+
+        with patch.object(VisualizeHistory, "generate_chart") as mock_chart:
+            self.assertTrue(VisualizeHistory(self.cfg).run())
+            mock_chart.assert_not_called()
+        self.assertTrue(debug_file.exists())
+
     def test_run_html_contains_created_at_timestamp(self):
         """HTML output should contain a creation timestamp in Europe/Stockholm timezone."""
         from datetime import datetime
@@ -698,6 +905,46 @@ class TestVisualizeHistory(unittest.TestCase):
         # Must be called on initial page load for the first chart
         self.assertIn("applyLastMonth('chart-' + _currencies[0])", content)
 
+    def test_run_reads_plotly_js_once_across_runs(self):
+        """plotly.js is memoized so repeated runs do not reload the multi-MB payload."""
+        import dataclasses
+        from unittest.mock import patch
+        from src import visualize_history
+
+        hist_dir = self.data_root / "history"
+        _create_history_csv(hist_dir, "BTC", n=50)
+        visualize_history._plotly_js.cache_clear()
+        self.addCleanup(visualize_history._plotly_js.cache_clear)
+        cfg = dataclasses.replace(self.cfg, visualize_force_regen=True)
+        with patch.object(visualize_history, "get_plotlyjs", return_value="/*plotly*/") as mock_js:
+            viz = VisualizeHistory(cfg)
+            self.assertTrue(viz.run())
+            self.assertTrue(viz.run())
+        mock_js.assert_called_once()
+        content = (self.data_root / "visualize" / "history_chart.html").read_text(
+            encoding="utf-8"
+        )
+        self.assertIn("<script>/*plotly*/</script>", content)
+
+    def test_run_loads_plotly_from_cdn_when_enabled(self):
+        import dataclasses
+        from plotly.offline import get_plotlyjs_version
+
+        hist_dir = self.data_root / "history"
+        _create_history_csv(hist_dir, "BTC", n=50)
+        html_file = self.data_root / "visualize" / "history_chart.html"
+        self.assertTrue(VisualizeHistory(self.cfg).run())
+        inline_size = html_file.stat().st_size
+
+        cfg = dataclasses.replace(self.cfg, visualize_plotly_cdn=True)
+        self.assertTrue(VisualizeHistory(cfg).run())
+        content = html_file.read_text(encoding="utf-8")
+        self.assertIn(
+            f'src="https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js" integrity="sha256-',
+            content,
+        )
+        self.assertLess(len(content), inline_size // 10)
+
     # ------------------------------------------------------------------
     # _write_debug_csv
     # ------------------------------------------------------------------
@@ -831,10 +1078,7 @@ class TestVisualizeHistory(unittest.TestCase):
 
         # Write a portfolio.json with a known USDC balance
         current_usdc = 0.04460852
-        portfolio_dir = self.data_root / "portfolio"
-        portfolio_dir.mkdir(parents=True, exist_ok=True)
-        with open(portfolio_dir / "portfolio.json", "w", encoding="utf-8") as f:
-            json.dump({"balances": {"USDC": {"total": str(current_usdc)}}}, f)
+        _create_portfolio_json(self.data_root, {"USDC": current_usdc})
 
         cfg = Config(
             currencies=["BNB"],
@@ -890,10 +1134,7 @@ class TestVisualizeHistory(unittest.TestCase):
         # Current BNB balance as known from the exchange.
         # Implied pre-bot balance: 0.309 - 0.159 = 0.150 BNB.
         current_bnb = 0.309
-        portfolio_dir = self.data_root / "portfolio"
-        portfolio_dir.mkdir(parents=True, exist_ok=True)
-        with open(portfolio_dir / "portfolio.json", "w", encoding="utf-8") as f:
-            json.dump({"balances": {"BNB": {"total": str(current_bnb)}, "USDC": {"total": "0.0"}}}, f)
+        _create_portfolio_json(self.data_root, {"BNB": current_bnb, "USDC": "0.0"})
 
         cfg = Config(
             currencies=["BNB"],
@@ -950,9 +1191,8 @@ class TestVisualizeHistory(unittest.TestCase):
         """Create a minimal backtesting CSV file for testing."""
         bt_dir = self.data_root / "output" / "backtesting"
         bt_dir.mkdir(parents=True, exist_ok=True)
-        import csv as _csv
         with open(bt_dir / f"{currency}_backtesting.csv", "w", newline="", encoding="utf-8") as f:
-            writer = _csv.DictWriter(f, fieldnames=["timestamp_ms", "currency", "ta_signal", "signal"])
+            writer = csv.DictWriter(f, fieldnames=["timestamp_ms", "currency", "ta_signal", "signal"])
             writer.writeheader()
             writer.writerow({"timestamp_ms": 1_700_003_600_000, "currency": currency, "ta_signal": 0, "signal": signal})
 